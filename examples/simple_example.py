@@ -11,6 +11,13 @@ sys.path.insert(0, PROJECT_ROOT)
 from src.orchestrator.workflow_orchestrator import WorkflowOrchestrator
 
 
+def _is_missing(path, input_dir, present):
+    """True if `path` doesn't exist (`present` lists the files in `input_dir`)"""
+    if os.path.dirname(path) == input_dir:
+        return os.path.basename(path) not in present
+    return not os.path.exists(path)
+
+
 def run_example():
     """Run a simple example"""
 
@@ -35,8 +42,13 @@ def run_example():
         "data/input/closeup_bottle.jpg",
     ]
 
-    # Validate image paths early (better DX)
-    missing = [p for p in image_paths if not os.path.exists(p)]
+    # Validate image paths early (better DX): one directory listing instead of a stat per image
+    input_dir = "data/input"
+    try:
+        present = {entry.name for entry in os.scandir(input_dir)}
+    except FileNotFoundError:
+        present = set()
+    missing = [p for p in image_paths if _is_missing(p, input_dir, present)]
     if missing:
         print("❌ Missing image files:")
         for p in missing:
@@ -0,0 +1,227 @@
+"""
+Semantic response cache for Claude calls.
+
+Opt-in via LLM_SEMANTIC_CACHE=1. The per-request prompt is embedded with sentence-transformers
+and looked up in a FAISS inner-product index; a stored response is reused when the cosine
+similarity to a previous prompt is above LLM_SEMANTIC_CACHE_THRESHOLD (default 0.95).
+Everything static around the prompt (model, system prompt, cached prefix, sampling settings)
+must match exactly: it is hashed into a namespace, and each namespace has its own index.
+Prompts longer than the encoder's max_seq_length (the encoder would truncate them) are only
+reused on an exact match within their namespace.
+Only low-temperature calls are cached (LLM_SEMANTIC_CACHE_MAX_TEMPERATURE, default 0.5),
+since high-temperature calls are expected to vary between runs.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+CACHE_DIR = os.path.join("data", "cache", "llm")
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# Append-only log of pickled (namespace, key, response, ts, vector or None) records
+LOG_FILE = "entries.log"
+
+logger = logging.getLogger("LLMCache")
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_namespace(*parts: Any) -> str:
+    """
+    Exact key for everything around the embedded prompt (model, temperature, system prompt,
+    static prefix...). Only prompts within the same namespace are compared semantically.
+    """
+    return _hash("\x1f".join("" if part is None else str(part) for part in parts))
+
+
+class SemanticLLMCache:
+    """FAISS-backed (prompt embedding -> response) cache persisted under data/cache/llm/"""
+
+    def __init__(self, cache_dir: str = CACHE_DIR, threshold: float = 0.95, model_name: str = EMBEDDING_MODEL):
+        import faiss
+        from sentence_transformers import SentenceTransformer
+
+        self._faiss = faiss
+        self.cache_dir = cache_dir
+        self.log_file = os.path.join(cache_dir, LOG_FILE)
+        self.threshold = threshold
+        self.encoder = SentenceTransformer(model_name)
+
+        self.dim = self.encoder.get_sentence_embedding_dimension()
+        self.entries: List[Tuple[str, str, str, float]] = []  # (namespace, key, response, ts)
+        self._by_key: Dict[str, int] = {}
+        # namespace -> (inner-product index, entry position of each index row)
+        self._indexes: Dict[str, Tuple[Any, List[int]]] = {}
+
+        # Embeddings computed on a miss, reused when the response is stored
+        self._pending: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+        self._load()
+
+    def get(self, namespace: str, text: str) -> Optional[str]:
+        """Return a cached response for `text` (exact or semantically similar) within `namespace`, else None."""
+        key = _hash(namespace + text)
+        with self._lock:
+            idx = self._by_key.get(key)
+            if idx is not None:
+                return self.entries[idx][2]
+
+        if not self._fits(text):
+            return None
+
+        vec = self._embed(text)
+        with self._lock:
+            found = self._indexes.get(namespace)
+            if found is not None:
+                index, positions = found
+                scores, ids = index.search(vec, 1)
+                if scores[0][0] >= self.threshold:
+                    logger.debug(f"Semantic cache hit (similarity={scores[0][0]:.3f})")
+                    return self.entries[positions[int(ids[0][0])]][2]
+
+            if len(self._pending) > 64:
+                self._pending.clear()
+            self._pending[key] = vec
+        return None
+
+    def put(self, namespace: str, text: str, response: str) -> None:
+        """Store the response for `text` within `namespace` and append it to the cache log."""
+        key = _hash(namespace + text)
+        with self._lock:
+            if key in self._by_key:
+                return
+            vec = self._pending.pop(key, None)
+        if vec is None and self._fits(text):
+            vec = self._embed(text)
+
+        record = (namespace, key, response, time.time(), vec)
+        with self._lock:
+            if key in self._by_key:
+                return
+            self._append(record)
+            self._add(record)
+
+    def _fits(self, text: str) -> bool:
+        """
+        True if the encoder sees all of `text`. Longer inputs are truncated, so two prompts
+        differing only past the cut-off would embed identically: those are matched exactly only.
+        """
+        # +2 for the [CLS]/[SEP] tokens the encoder adds
+        return len(self.encoder.tokenizer.tokenize(text)) + 2 <= self.encoder.max_seq_length
+
+    def _add(self, record: Tuple[str, str, str, float, Optional[np.ndarray]]) -> None:
+        namespace, key, response, ts, vec = record
+        self.entries.append((namespace, key, response, ts))
+        position = len(self.entries) - 1
+        self._by_key[key] = position
+        if vec is None:
+            return
+
+        found = self._indexes.get(namespace)
+        if found is None:
+            found = (self._faiss.IndexFlatIP(self.dim), [])
+            self._indexes[namespace] = found
+        index, positions = found
+        index.add(vec)
+        positions.append(position)
+
+    def _embed(self, text: str) -> np.ndarray:
+        vec = self.encoder.encode([text], normalize_embeddings=True)
+        return np.asarray(vec, dtype=np.float32).reshape(1, -1)
+
+    def _append(self, record: Tuple[str, str, str, float, Optional[np.ndarray]]) -> None:
+        # One write per entry: the log only ever grows, and a torn last record is dropped on load
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.log_file, "ab") as f:
+            f.write(pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _load(self) -> None:
+        if not os.path.exists(self.log_file):
+            return
+
+        records = []
+        torn = False
+        try:
+            size = os.path.getsize(self.log_file)
+            with open(self.log_file, "rb") as f:
+                while f.tell() < size:
+                    try:
+                        record = pickle.load(f)
+                    except (EOFError, pickle.UnpicklingError, ValueError):
+                        torn = True
+                        break
+                    if not self._valid(record):
+                        torn = True
+                        break
+                    records.append(record)
+        except OSError as e:
+            logger.warning(f"Could not load LLM cache from {self.cache_dir}: {e}")
+            return
+
+        for record in records:
+            if record[1] not in self._by_key:
+                self._add(record)
+
+        if torn:
+            # Interrupted write (or foreign data): keep the intact prefix and rewrite the log
+            logger.warning(f"LLM cache log {self.log_file} is damaged; keeping {len(records)} intact entries")
+            try:
+                self._rewrite(records)
+            except OSError as e:
+                logger.warning(f"Could not rewrite LLM cache log: {e}")
+
+    def _valid(self, record: Any) -> bool:
+        if not (isinstance(record, tuple) and len(record) == 5):
+            return False
+        vec = record[4]
+        return vec is None or (isinstance(vec, np.ndarray) and vec.shape == (1, self.dim))
+
+    def _rewrite(self, records: List[Tuple[str, str, str, float, Optional[np.ndarray]]]) -> None:
+        """Replace the log atomically: readers see either the old or the new file, never a mix."""
+        tmp = tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".part", delete=False)
+        try:
+            with tmp:
+                for record in records:
+                    tmp.write(pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL))
+            os.replace(tmp.name, self.log_file)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+
+
+_cache: Optional[SemanticLLMCache] = None
+_cache_disabled = False
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache(temperature: float) -> Optional[SemanticLLMCache]:
+    """Shared cache instance, or None when caching is off or not applicable to `temperature`."""
+    global _cache, _cache_disabled
+
+    if os.getenv("LLM_SEMANTIC_CACHE", "0") != "1" or _cache_disabled:
+        return None
+    if temperature > float(os.getenv("LLM_SEMANTIC_CACHE_MAX_TEMPERATURE", "0.5")):
+        return None
+
+    with _cache_lock:
+        if _cache is None and not _cache_disabled:
+            try:
+                _cache = SemanticLLMCache(
+                    threshold=float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", "0.95"))
+                )
+            except ImportError as e:
+                logger.warning(
+                    f"LLM_SEMANTIC_CACHE=1 but cache dependencies are missing ({e}); "
+                    "pip install -r requirements-cache.txt. Caching disabled."
+                )
+                _cache_disabled = True
+        return _cache
@@ -0,0 +1,119 @@
+"""Shared helpers for pulling JSON out of LLM responses."""
+from typing import Any, Optional
+import io
+import json
+import re
+
+import orjson
+
+_FENCE_HEAD = re.compile(r"^```(?:json)?\s*", re.IGNORECASE)
+_FENCE_TAIL = re.compile(r"\s*```$")
+
+_DECODER = json.JSONDecoder()
+
+
+def strip_fences(text: str) -> str:
+    """Strip surrounding whitespace and markdown code fences (```json ... ```)."""
+    cleaned = text.strip()
+    # Most responses have no fences: only run the regexes when there is one to strip
+    if cleaned.startswith("```"):
+        cleaned = _FENCE_HEAD.sub("", cleaned, count=1)
+    if cleaned.endswith("```"):
+        cleaned = _FENCE_TAIL.sub("", cleaned, count=1)
+    return cleaned
+
+
+def decode_json_object(text: str) -> Optional[Any]:
+    """
+    Parse the first JSON object embedded in `text` (e.g. surrounded by prose), or None.
+
+    Uses the stdlib decoder's raw_decode (orjson has no equivalent): it parses from an
+    opening brace to the end of that object in one pass and ignores whatever follows.
+    """
+    start = text.find("{")
+    while start != -1:
+        try:
+            obj, _end = _DECODER.raw_decode(text, start)
+            return obj
+        except json.JSONDecodeError:
+            # A brace in the prose before the real object: try the next one
+            start = text.find("{", start + 1)
+    return None
+
+
+def loads_json(text: str) -> Any:
+    """Parse JSON with orjson (raises orjson.JSONDecodeError, a json.JSONDecodeError subclass)."""
+    return orjson.loads(text)
+
+
+class JsonObjectScanner:
+    """
+    Incrementally locates the first complete top-level JSON object in streamed text.
+
+    Tracks brace depth while skipping braces inside string literals, so a streamed
+    response can be parsed as soon as its outermost object closes.
+    """
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._length = 0
+        self.start = -1
+        self._depth = 0
+        self._in_str = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        Append a chunk; return the object text once a complete, valid JSON object is seen, else None.
+
+        Balanced braces that do not parse (e.g. "{your product}" in leading prose) are skipped
+        and scanning resumes after them.
+        """
+        offset = self._length
+        self._buffer.write(chunk)
+        self._length += len(chunk)
+
+        while True:
+            end = self.scan(chunk, offset)
+            if end is None:
+                return None
+            candidate = self._buffer.getvalue()[self.start:end]
+            try:
+                loads_json(candidate)
+                return candidate
+            except json.JSONDecodeError:
+                # Depth is back to 0: keep scanning the rest of this chunk
+                chunk = chunk[end - offset:]
+                offset = end
+
+    def scan(self, chunk: str, offset: int) -> Optional[int]:
+        """
+        Advance the scanner over `chunk` (starting at absolute position `offset`).
+
+        Returns the absolute end index (exclusive) of the object once it closes, else None;
+        `start` holds the index of its opening brace.
+        """
+        for i, ch in enumerate(chunk):
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_str = False
+            elif ch == '"':
+                if self._depth > 0:
+                    self._in_str = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self.start = offset + i
+                self._depth += 1
+            elif ch == "}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    return offset + i + 1
+        return None
+
+    def getvalue(self) -> str:
+        """Everything fed so far."""
+        return self._buffer.getvalue()
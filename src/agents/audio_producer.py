@@ -1,13 +1,52 @@
 from .base_agent import BaseAgent
-from typing import Dict, Any, List, Optional
-from gtts import gTTS
+from ..utils.paths import setup_directories
+from typing import Dict, Any, BinaryIO, Iterator, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+import asyncio
+import hashlib
+import json
 import os
+import tempfile
 import time
 
-try:
-    from elevenlabs.client import ElevenLabs
-except Exception:
-    ElevenLabs = None  # optional dependency import guard
+AUDIO_WRITE_BUFFER = 1 << 20
+
+ELEVENLABS_MODEL_ID = "eleven_multilingual_v2"
+GTTS_LANG = "en"
+
+# NamedTemporaryFile creates 0600 files; published voiceovers get the usual umask-based mode.
+# os.umask can only be read by setting it, so do that once at import time.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextmanager
+def _atomic_write(output_path: str) -> Iterator[BinaryIO]:
+    """
+    Write to a unique temp file next to `output_path` and move it into place on success.
+
+    A failed or interrupted write never becomes a cache hit, and its temp file is removed.
+    Concurrent runs writing the same voiceover each get their own temp file.
+    """
+    tmp = tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(output_path) or ".",
+        prefix=os.path.basename(output_path) + ".",
+        suffix=".part",
+        delete=False,
+        buffering=AUDIO_WRITE_BUFFER,
+    )
+    try:
+        with tmp:
+            yield tmp
+        os.chmod(tmp.name, 0o666 & ~_UMASK)
+        os.replace(tmp.name, output_path)
+    except BaseException:
+        try:
+            os.unlink(tmp.name)
+        except FileNotFoundError:
+            pass
+        raise
 
 
 class AudioProducerAgent(BaseAgent):
@@ -15,21 +54,33 @@ class AudioProducerAgent(BaseAgent):
 
     def __init__(self):
         super().__init__(name="AudioProducer")
+        setup_directories()
 
         self.elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY")
+        self.elevenlabs_voice_id = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
         self.voice_provider = os.getenv("VOICE_PROVIDER", "gtts")  # gtts or elevenlabs
 
+        # TTS is a blocking HTTP round trip; run it off the caller's thread so it can
+        # overlap with other work (music selection, other agents' LLM calls)
+        self._tts_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tts")
+
         # Initialize ElevenLabs client if available + key exists
         self.eleven_client = None
         if self.voice_provider.lower() == "elevenlabs":
             if not self.elevenlabs_api_key:
                 self.logger.warning("VOICE_PROVIDER=elevenlabs but ELEVENLABS_API_KEY is not set. Falling back to gtts.")
                 self.voice_provider = "gtts"
-            elif ElevenLabs is None:
-                self.logger.warning("elevenlabs package not importable. Falling back to gtts.")
-                self.voice_provider = "gtts"
             else:
-                self.eleven_client = ElevenLabs(api_key=self.elevenlabs_api_key)
+                try:
+                    from elevenlabs.client import ElevenLabs
+                except Exception:
+                    ElevenLabs = None  # optional dependency import guard
+
+                if ElevenLabs is None:
+                    self.logger.warning("elevenlabs package not importable. Falling back to gtts.")
+                    self.voice_provider = "gtts"
+                else:
+                    self.eleven_client = ElevenLabs(api_key=self.elevenlabs_api_key)
 
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -54,29 +105,168 @@ class AudioProducerAgent(BaseAgent):
         duration: int = int(input_data.get("duration", 30))
         scenes: List[Dict[str, Any]] = input_data.get("scenes", []) or []
 
-        # Generate voiceover
-        voiceover_path = self._generate_voiceover(script, instructions)
+        # Generate voiceover in the background while the rest is assembled
+        voiceover_future = self.submit_voiceover(script, instructions)
 
         # Select music (placeholder for now)
         music_selection = self._select_music(
             input_data.get("music_style", "upbeat"),
             duration
         )
+        audio_timeline = self._create_audio_timeline(scenes, duration)
 
         return {
-            "voiceover_path": voiceover_path,
+            "voiceover_path": voiceover_future.result(),
             "music_recommendation": music_selection,
+            "audio_timeline": audio_timeline,
+        }
+
+    async def aprocess(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of `process` (keeps the event loop free while TTS runs)"""
+        self.validate_input(input_data, ["script"])
+
+        script: str = input_data["script"]
+        instructions: Dict[str, Any] = input_data.get("voiceover_instructions", {}) or {}
+        duration: int = int(input_data.get("duration", 30))
+        scenes: List[Dict[str, Any]] = input_data.get("scenes", []) or []
+
+        voiceover_path = await self._agenerate_voiceover(script, instructions)
+
+        return {
+            "voiceover_path": voiceover_path,
+            "music_recommendation": self._select_music(input_data.get("music_style", "upbeat"), duration),
             "audio_timeline": self._create_audio_timeline(scenes, duration),
         }
 
-    def _generate_voiceover(self, script: str, instructions: Dict[str, Any]) -> str:
-        """Generate voiceover from script."""
+    def submit_voiceover(self, script: str, instructions: Dict[str, Any]) -> Future:
+        """Start voiceover generation on the TTS thread pool; returns a Future of the audio path."""
+        return self._tts_executor.submit(self._generate_voiceover, script, instructions)
+
+    def _voiceover_output_path(self, script: str, provider: str, voice_params: Dict[str, Any]) -> str:
+        """
+        Content-addressed output path: same script + provider + voice params -> same file.
+
+        `voice_params` holds only the settings that change the audio (e.g. lang/slow for gTTS),
+        not the full LLM-written voiceover instructions, which vary from run to run.
+        """
         output_dir = "data/output/audio"
-        os.makedirs(output_dir, exist_ok=True)
 
-        ts = int(time.time())
+        params = json.dumps(voice_params, sort_keys=True, default=str)
+        key = hashlib.sha256((script + provider + params).encode("utf-8")).hexdigest()[:16]
         ext = "mp3"
-        output_path = os.path.join(output_dir, f"voiceover_{ts}.{ext}")
+        return os.path.join(output_dir, f"voiceover_{key}.{ext}")
+
+    def _is_cached(self, output_path: str) -> bool:
+        """True if a previous run already produced this voiceover (and it hasn't expired)."""
+        try:
+            st = os.stat(output_path)
+        except FileNotFoundError:
+            return False
+
+        ttl_days = float(os.getenv("VOICEOVER_CACHE_TTL_DAYS", "0") or 0)
+        if ttl_days > 0 and time.time() - st.st_mtime > ttl_days * 86400:
+            os.remove(output_path)
+            return False
+
+        self.logger.info(f"Reusing cached voiceover: {output_path}")
+        return True
+
+    def _generate_voiceover(self, script: str, instructions: Dict[str, Any]) -> str:
+        """Generate voiceover from script."""
+        provider = self.voice_provider.lower()
+        if provider == "elevenlabs" and self.eleven_client is not None:
+            output_path = self._voiceover_output_path(
+                script, "elevenlabs", {"voice_id": self.elevenlabs_voice_id, "model_id": ELEVENLABS_MODEL_ID}
+            )
+            if self._is_cached(output_path):
+                return output_path
+
+            try:
+                audio = self.eleven_client.text_to_speech.convert(
+                    voice_id=self.elevenlabs_voice_id,
+                    text=script,
+                    model_id=ELEVENLABS_MODEL_ID,
+                )
+                # The SDK yields small chunks: a large buffer turns them into a few big writes.
+                with _atomic_write(output_path) as f:
+                    for chunk in audio:
+                        f.write(chunk)
+                self.logger.info(f"Voiceover generated (ElevenLabs): {output_path}")
+                return output_path
+            except Exception as e:
+                self.logger.warning(f"ElevenLabs voiceover failed ({e}). Falling back to gtts.")
+
+        return self._generate_gtts(script, instructions)
+
+    async def _agenerate_voiceover(self, script: str, instructions: Dict[str, Any]) -> str:
+        """Async variant of `_generate_voiceover`."""
+        provider = self.voice_provider.lower()
+        if provider == "elevenlabs" and self.eleven_client is not None:
+            from elevenlabs.client import AsyncElevenLabs
 
-        provider = self.voice_provider.lo_
+            output_path = self._voiceover_output_path(
+                script, "elevenlabs", {"voice_id": self.elevenlabs_voice_id, "model_id": ELEVENLABS_MODEL_ID}
+            )
+            if self._is_cached(output_path):
+                return output_path
 
+            try:
+                aclient = AsyncElevenLabs(api_key=self.elevenlabs_api_key)
+                with _atomic_write(output_path) as f:
+                    async for chunk in aclient.text_to_speech.convert(
+                        voice_id=self.elevenlabs_voice_id,
+                        text=script,
+                        model_id=ELEVENLABS_MODEL_ID,
+                    ):
+                        f.write(chunk)
+                self.logger.info(f"Voiceover generated (ElevenLabs): {output_path}")
+                return output_path
+            except Exception as e:
+                self.logger.warning(f"ElevenLabs voiceover failed ({e}). Falling back to gtts.")
+                return await asyncio.to_thread(self._generate_gtts, script, instructions)
+
+        # gTTS has no async client: await the thread-pool future instead of blocking the loop
+        return await asyncio.wrap_future(self.submit_voiceover(script, instructions))
+
+    def _generate_gtts(self, script: str, instructions: Dict[str, Any]) -> str:
+        """Generate voiceover with Google TTS (free, no voice control beyond pace)."""
+        slow = str(instructions.get("pace", "")).lower() == "slow"
+        output_path = self._voiceover_output_path(script, "gtts", {"lang": GTTS_LANG, "slow": slow})
+        if self._is_cached(output_path):
+            return output_path
+
+        from gtts import gTTS
+
+        with _atomic_write(output_path) as f:
+            gTTS(text=script, lang=GTTS_LANG, slow=slow).write_to_fp(f)
+        self.logger.info(f"Voiceover generated (gTTS): {output_path}")
+        return output_path
+
+    def _select_music(self, music_style: str, duration: int) -> Dict[str, Any]:
+        """Recommend background music (placeholder until a music library is wired in)."""
+        return {
+            "style": music_style,
+            "duration": duration,
+            "volume": 0.3,
+            "track_path": None,
+            "note": "No music library configured; add a licensed track matching this style.",
+        }
+
+    def _create_audio_timeline(self, scenes: List[Dict[str, Any]], duration: int) -> Dict[str, Any]:
+        """Map voiceover lines to scene timings and lay the music bed under the whole video."""
+        segments: List[Dict[str, Any]] = []
+        for scene in scenes:
+            segments.append(
+                {
+                    "scene_id": scene.get("scene_id"),
+                    "start_time": scene.get("start_time"),
+                    "end_time": scene.get("end_time"),
+                    "text": scene.get("script_text", ""),
+                }
+            )
+
+        return {
+            "total_duration": duration,
+            "voiceover": {"start_time": 0, "segments": segments},
+            "music": {"start_time": 0, "end_time": duration, "volume": 0.3, "fade_in": 1.0, "fade_out": 2.0},
+        }
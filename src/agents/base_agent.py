@@ -1,13 +1,89 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, AsyncIterator, Awaitable, List, Optional, Sequence, TypeVar
+from contextlib import aclosing
+import asyncio
+import json
 import os
 import logging
+import threading
+import time
+import weakref
 
 import anthropic
+import httpx
 from dotenv import load_dotenv
 
+from ._llm_cache import cache_namespace, get_llm_cache
+from ._parse import JsonObjectScanner, decode_json_object, loads_json, strip_fences
+
 load_dotenv()
 
+T = TypeVar("T")
+
+# One HTTP/2 connection pool shared by every agent, so TLS to api.anthropic.com is set up once
+# per process. Async clients are bound to the event loop that created them, hence one per loop.
+_HTTP_LIMITS = httpx.Limits(max_connections=16, max_keepalive_connections=16)
+_SHARED_CLIENT: Optional[anthropic.Anthropic] = None
+_SHARED_ACLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, anthropic.AsyncAnthropic]" = (
+    weakref.WeakKeyDictionary()
+)
+_CLIENT_LOCK = threading.Lock()
+
+
+def _shared_client(api_key: str) -> anthropic.Anthropic:
+    global _SHARED_CLIENT
+    with _CLIENT_LOCK:
+        if _SHARED_CLIENT is None:
+            _SHARED_CLIENT = anthropic.Anthropic(
+                api_key=api_key,
+                http_client=anthropic.DefaultHttpxClient(http2=True, limits=_HTTP_LIMITS),
+            )
+        return _SHARED_CLIENT
+
+
+def _shared_aclient(api_key: str) -> anthropic.AsyncAnthropic:
+    loop = asyncio.get_running_loop()
+    with _CLIENT_LOCK:
+        aclient = _SHARED_ACLIENTS.get(loop)
+        if aclient is None:
+            aclient = anthropic.AsyncAnthropic(
+                api_key=api_key,
+                http_client=anthropic.DefaultAsyncHttpxClient(http2=True, limits=_HTTP_LIMITS),
+            )
+            _SHARED_ACLIENTS[loop] = aclient
+        return aclient
+
+
+async def _close_aclient() -> None:
+    """Close and forget the running loop's shared async client (its sockets belong to this loop)."""
+    loop = asyncio.get_running_loop()
+    with _CLIENT_LOCK:
+        aclient = _SHARED_ACLIENTS.pop(loop, None)
+    if aclient is not None:
+        await aclient.close()
+
+
+def run_async(coro: Awaitable[T]) -> T:
+    """
+    `asyncio.run` for the sync entry points.
+
+    Each run gets a fresh event loop; the async client bound to it is closed before the loop
+    goes away (the client references its loop, so it would otherwise never be released).
+    """
+
+    async def runner() -> T:
+        try:
+            return await coro
+        finally:
+            await _close_aclient()
+
+    return asyncio.run(runner())
+
+
+# Process-wide agent instances, see BaseAgent.get()
+_AGENT_CACHE: Dict[type, "BaseAgent"] = {}
+_AGENT_CACHE_LOCK = threading.RLock()
+
 
 class BaseAgent(ABC):
     """Base class for all agents in the system"""
@@ -22,40 +98,307 @@ class BaseAgent(ABC):
                 "ANTHROPIC_API_KEY is not set. Add it to your .env file."
             )
 
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.api_key = api_key
+        self.client = _shared_client(api_key)
 
         # Use a per-agent logger name (nice for debugging multi-agent runs)
         self.logger = logging.getLogger(name)
         if not logging.getLogger().handlers:
             logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 
+    @classmethod
+    def get(cls) -> "BaseAgent":
+        """
+        Return the shared instance of this agent class, creating it on first use.
+
+        Lets repeated workflow runs (e.g. in server mode) skip client and logger setup.
+        """
+        with _AGENT_CACHE_LOCK:
+            agent = _AGENT_CACHE.get(cls)
+            if agent is None:
+                agent = cls()
+                _AGENT_CACHE[cls] = agent
+            return agent
+
+    @property
+    def aclient(self) -> anthropic.AsyncAnthropic:
+        """Async Claude client for the currently running event loop"""
+        return _shared_aclient(self.api_key)
+
     @abstractmethod
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Main processing method - must be implemented by each agent"""
         raise NotImplementedError
 
-    def call_llm(self, prompt: str, system_prompt: str = None, temperature: float = 0.7) -> str:
+    async def aprocess(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Async processing entry point.
+
+        Defaults to running the blocking `process` in a worker thread; agents that
+        talk to Claude override this with a native coroutine.
+        """
+        return await asyncio.to_thread(self.process, input_data)
+
+    def _build_llm_kwargs(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        temperature: float = 0.7,
+        cached_prefix: str = None,
+        max_tokens: int = 1024,
+        stop_sequences: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Build the keyword arguments for a Messages API call.
+
+        The system prompt and the optional `cached_prefix` (static schema/rules that precede
+        the per-request content) are marked for Anthropic prompt caching.
+        """
+        content: List[Dict[str, Any]] = []
+        if cached_prefix:
+            content.append(
+                {"type": "text", "text": cached_prefix, "cache_control": {"type": "ephemeral"}}
+            )
+        content.append({"type": "text", "text": prompt})
+
+        messages = [{"role": "user", "content": content}]
+
+        kwargs = {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": messages,
+            "extra_headers": {"anthropic-beta": "prompt-caching-2024-07-31"},
+        }
+
+        if stop_sequences:
+            kwargs["stop_sequences"] = list(stop_sequences)
+
+        if system_prompt:
+            kwargs["system"] = [
+                {"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}
+            ]
+
+        return kwargs
+
+    def _cache_namespace(
+        self,
+        system_prompt: str = None,
+        temperature: float = 0.7,
+        cached_prefix: str = None,
+        max_tokens: int = 1024,
+        stop_sequences: Optional[List[str]] = None,
+    ) -> str:
+        """Exact semantic cache namespace: everything in the call except the embedded prompt"""
+        return cache_namespace(
+            self.model, temperature, max_tokens, stop_sequences, system_prompt, cached_prefix
+        )
+
+    def _log_usage(self, response: Any) -> None:
+        """Log token usage, including prompt-cache reads/writes"""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        self.logger.debug(
+            "LLM usage: input=%s output=%s cache_read=%s cache_write=%s",
+            getattr(usage, "input_tokens", None),
+            getattr(usage, "output_tokens", None),
+            getattr(usage, "cache_read_input_tokens", 0) or 0,
+            getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        )
+
+    def call_llm(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        temperature: float = 0.7,
+        cached_prefix: str = None,
+        max_tokens: int = 1024,
+        stop_sequences: Optional[List[str]] = None,
+    ) -> str:
         """Helper method to call Claude API"""
         try:
-            messages = [{"role": "user", "content": prompt}]
+            cache = get_llm_cache(temperature)
+            namespace = self._cache_namespace(
+                system_prompt, temperature, cached_prefix, max_tokens, stop_sequences
+            )
+            if cache is not None:
+                cached = cache.get(namespace, prompt)
+                if cached is not None:
+                    self.logger.info("LLM response served from semantic cache")
+                    return cached
 
-            kwargs = {
-                "model": self.model,
-                "max_tokens": 4096,
-                "temperature": temperature,
-                "messages": messages,
-            }
+            kwargs = self._build_llm_kwargs(
+                prompt, system_prompt, temperature, cached_prefix, max_tokens, stop_sequences
+            )
+            response = self.client.messages.create(**kwargs)
+            self._log_usage(response)
+            text = response.content[0].text
 
-            if system_prompt:
-                kwargs["system"] = system_prompt
+            if cache is not None:
+                cache.put(namespace, prompt, text)
+            return text
 
-            response = self.client.messages.create(**kwargs)
-            return response.content[0].text
+        except Exception as e:
+            self.logger.error(f"Error calling LLM: {e}")
+            raise
+
+    async def acall_llm(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        temperature: float = 0.7,
+        cached_prefix: str = None,
+        max_tokens: int = 1024,
+        stop_sequences: Optional[List[str]] = None,
+    ) -> str:
+        """Async variant of `call_llm` (lets independent agents overlap their network waits)"""
+        try:
+            cache = get_llm_cache(temperature)
+            namespace = self._cache_namespace(
+                system_prompt, temperature, cached_prefix, max_tokens, stop_sequences
+            )
+            if cache is not None:
+                # Embedding is CPU-bound; keep it off the event loop
+                cached = await asyncio.to_thread(cache.get, namespace, prompt)
+                if cached is not None:
+                    self.logger.info("LLM response served from semantic cache")
+                    return cached
+
+            kwargs = self._build_llm_kwargs(
+                prompt, system_prompt, temperature, cached_prefix, max_tokens, stop_sequences
+            )
+            response = await self.aclient.messages.create(**kwargs)
+            self._log_usage(response)
+            text = response.content[0].text
+
+            if cache is not None:
+                await asyncio.to_thread(cache.put, namespace, prompt, text)
+            return text
+
+        except Exception as e:
+            self.logger.error(f"Error calling LLM: {e}")
+            raise
+
+    async def acall_llm_stream(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        temperature: float = 0.7,
+        cached_prefix: str = None,
+        max_tokens: int = 1024,
+        stop_sequences: Optional[List[str]] = None,
+    ) -> AsyncIterator[str]:
+        """Stream the Claude response as text deltas"""
+        try:
+            kwargs = self._build_llm_kwargs(
+                prompt, system_prompt, temperature, cached_prefix, max_tokens, stop_sequences
+            )
+            async with self.aclient.messages.stream(**kwargs) as stream:
+                async for text in stream.text_stream:
+                    yield text
+                self._log_usage(await stream.get_final_message())
 
         except Exception as e:
             self.logger.error(f"Error calling LLM: {e}")
             raise
 
+    async def acall_llm_json(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        temperature: float = 0.7,
+        cached_prefix: str = None,
+        max_tokens: int = 1024,
+        stop_sequences: Optional[List[str]] = None,
+    ) -> str:
+        """
+        Stream a JSON-only response and return as soon as its outermost object is complete.
+
+        Falls back to the full response text when no valid object is found (that text is not cached).
+        """
+        cache = get_llm_cache(temperature)
+        namespace = self._cache_namespace(
+            system_prompt, temperature, cached_prefix, max_tokens, stop_sequences
+        )
+        if cache is not None:
+            cached = await asyncio.to_thread(cache.get, namespace, prompt)
+            if cached is not None:
+                self.logger.info("LLM response served from semantic cache")
+                return cached
+
+        scanner = JsonObjectScanner()
+        text = None
+        stream = self.acall_llm_stream(
+            prompt, system_prompt, temperature, cached_prefix, max_tokens, stop_sequences
+        )
+        async with aclosing(stream) as deltas:
+            async for delta in deltas:
+                text = scanner.feed(delta)
+                if text is not None:
+                    break
+
+        if text is None:
+            # No valid object closed while streaming: keep the full text for the caller's parser
+            text = scanner.getvalue()
+            if decode_json_object(strip_fences(text)) is None:
+                self.logger.warning("Streamed LLM response contains no valid JSON object; not caching it")
+                return text
+        if cache is not None:
+            await asyncio.to_thread(cache.put, namespace, prompt, text)
+        return text
+
+    def submit_batch(
+        self,
+        prompts: List[Sequence[Any]],
+        max_tokens: int = 1024,
+        custom_ids: Optional[List[str]] = None,
+    ) -> str:
+        """
+        Submit prompts through the Message Batches API (async, ~50% cheaper, results within 24h).
+
+        Each entry is (prompt, system_prompt, temperature) or
+        (prompt, system_prompt, temperature, cached_prefix). Returns the batch id.
+        """
+        requests = []
+        for i, (prompt, system_prompt, temperature, *rest) in enumerate(prompts):
+            cached_prefix = rest[0] if rest else None
+            params = self._build_llm_kwargs(prompt, system_prompt, temperature, cached_prefix, max_tokens)
+            params.pop("extra_headers")
+            requests.append(
+                {"custom_id": custom_ids[i] if custom_ids else f"{self.name}-{i}", "params": params}
+            )
+
+        batch = self.client.beta.messages.batches.create(
+            requests=requests, betas=["prompt-caching-2024-07-31"]
+        )
+        self.logger.info(f"Submitted batch {batch.id} ({len(requests)} requests)")
+        return batch.id
+
+    def retrieve_batch(self, batch_id: str) -> Any:
+        """Current state of a submitted batch (processing_status, request_counts, ...)"""
+        return self.client.beta.messages.batches.retrieve(batch_id)
+
+    def wait_for_batch(self, batch_id: str, poll_interval: float = 60.0) -> Any:
+        """Poll until the batch has ended"""
+        while True:
+            batch = self.retrieve_batch(batch_id)
+            if batch.processing_status == "ended":
+                return batch
+            self.logger.info(f"Batch {batch_id} still processing: {batch.request_counts}")
+            time.sleep(poll_interval)
+
+    def batch_results(self, batch_id: str) -> Dict[str, str]:
+        """Response text per custom_id; failed or expired requests are logged and left out"""
+        results: Dict[str, str] = {}
+        for entry in self.client.beta.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                self._log_usage(entry.result.message)
+                results[entry.custom_id] = entry.result.message.content[0].text
+            else:
+                self.logger.error(f"Batch request {entry.custom_id} did not succeed: {entry.result.type}")
+        return results
+
     def validate_input(self, input_data: Dict[str, Any], required_fields: List[str]) -> bool:
         """Validate that input contains required fields"""
         for field in required_fields:
@@ -63,3 +406,18 @@ class BaseAgent(ABC):
                 raise ValueError(f"Missing required field: {field}")
         return True
 
+    def _parse_json_response(self, response: str, fallback: Dict[str, Any]) -> Dict[str, Any]:
+        """Robust JSON parsing, handles ```json fences and extra text."""
+        cleaned = strip_fences(response)
+
+        try:
+            return loads_json(cleaned)
+        except json.JSONDecodeError:
+            pass
+
+        parsed = decode_json_object(cleaned)
+        if parsed is not None:
+            return parsed
+
+        self.logger.warning(f"Could not parse JSON from {self.name} response")
+        return fallback
@@ -0,0 +1,123 @@
+from .base_agent import BaseAgent, run_async
+from .creative_director import CreativeDirectorAgent
+from .script_analyzer import ScriptAnalyzerAgent
+from typing import Dict, Any, Optional, Tuple
+
+
+class CombinedBriefAgent(BaseAgent):
+    """Agent that produces the creative brief and the script analysis in a single Claude call"""
+
+    SYSTEM_PROMPT = (
+        "You are an expert Creative Director and script analyst for video advertisements. "
+        "You create compelling creative concepts and turn scripts into actionable scenes "
+        "with precise timing and visual requirements. "
+        "Return ONLY valid JSON matching the requested schema."
+    )
+    # ScriptAnalyzer's temperature: the scene timing must stay as deterministic as in the
+    # separate call. The brief (0.7 on its own) comes out more conservative as a result;
+    # use WorkflowOrchestrator(combined_brief=False) when its variety matters more.
+    TEMPERATURE = 0.3
+    MAX_TOKENS = 3072
+
+    def __init__(
+        self,
+        creative_director: Optional[CreativeDirectorAgent] = None,
+        script_analyzer: Optional[ScriptAnalyzerAgent] = None,
+    ):
+        super().__init__(name="CombinedBrief")
+
+        # Reuse the single-purpose agents' prompts, parsing and schema checks
+        self.creative_director = creative_director or CreativeDirectorAgent.get()
+        self.script_analyzer = script_analyzer or ScriptAnalyzerAgent.get()
+
+    def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Creates the creative strategy and the scene breakdown together
+
+        Input:
+            - product_description: str
+            - target_audience: str
+            - script: str
+            - brand_guidelines: dict (optional)
+            - target_duration: int (seconds, optional)
+
+        Output:
+            - creative_brief: dict (same shape as CreativeDirectorAgent output)
+            - analysis: dict (same shape as ScriptAnalyzerAgent output)
+        """
+        return run_async(self.aprocess(input_data))
+
+    async def aprocess(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of `process`"""
+        self.validate_input(input_data, ["product_description", "target_audience", "script"])
+
+        cached_prefix, prompt = self._build_combined_prompt(input_data)
+
+        # Streamed: parsing starts as soon as the JSON object closes
+        response = await self.acall_llm_json(
+            prompt, self.SYSTEM_PROMPT, temperature=self.TEMPERATURE, cached_prefix=cached_prefix,
+            max_tokens=self.MAX_TOKENS,
+        )
+
+        return self._build_result(response, input_data)
+
+    def _build_result(self, response: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Split the combined response into the brief and the (timing-checked) analysis"""
+        combined = self._parse_json_response(response, fallback={})
+        if not isinstance(combined, dict):
+            # e.g. a top-level list: both parts fall back to the raw response below
+            self.logger.warning(f"Combined response is a {type(combined).__name__}, expected an object")
+            combined = {}
+
+        creative_brief = combined.get("creative_brief")
+        if not isinstance(creative_brief, dict):
+            creative_brief = {"raw_response": response}
+
+        analysis = combined.get("analysis")
+        if isinstance(analysis, dict):
+            self.script_analyzer._validate_timing(analysis)
+        else:
+            analysis = {"raw_response": response}
+
+        return {
+            "creative_brief": self.creative_director._check_required_keys(creative_brief),
+            "analysis": self.script_analyzer._apply_defaults(
+                analysis, input_data.get("target_duration", 30)
+            ),
+        }
+
+    def _build_combined_prompt(self, input_data: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Build the combined prompt from the Creative Director and Script Analyzer prompts.
+
+        Returns (cached_prefix, prompt) like the single-agent builders.
+        """
+        # The script is already part of the analysis prompt, and the analysis is produced
+        # alongside the brief, so neither prompt gets the other's input
+        creative_input = {k: v for k, v in input_data.items() if k != "script"}
+        analysis_input = {k: v for k, v in input_data.items() if k != "creative_brief"}
+
+        creative_prefix, creative_prompt = self.creative_director._build_creative_prompt(creative_input)
+        analysis_prefix, analysis_prompt = self.script_analyzer._build_analysis_prompt(analysis_input)
+
+        cached_prefix = f"""You will produce TWO deliverables for one video advertisement in a single JSON response.
+
+=== PART 1: CREATIVE BRIEF ===
+{creative_prefix}
+=== PART 2: SCRIPT ANALYSIS ===
+{analysis_prefix}
+=== RESPONSE FORMAT ===
+Return ONLY one valid JSON object (no markdown, no extra commentary) with exactly these top-level keys:
+{{
+  "creative_brief": {{ ...PART 1 schema... }},
+  "analysis": {{ ...PART 2 schema... }}
+}}
+
+The scene breakdown in "analysis" must follow the creative direction you give in "creative_brief".
+"""
+
+        prompt = f"""{creative_prompt}
+
+{analysis_prompt}"""
+
+        return cached_prefix, prompt
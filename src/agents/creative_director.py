@@ -1,7 +1,7 @@
-from .base_agent import BaseAgent
-from typing import Dict, Any
+from .base_agent import BaseAgent, run_async
+from ._parse import decode_json_object, loads_json, strip_fences
+from typing import Dict, Any, Tuple
 import json
-import re
 
 
 class CreativeDirectorAgent(BaseAgent):
@@ -31,9 +31,13 @@ class CreativeDirectorAgent(BaseAgent):
             - music_style: str
             - pacing: str
         """
+        return run_async(self.aprocess(input_data))
+
+    async def aprocess(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of `process`"""
         self.validate_input(input_data, ["product_description", "target_audience"])
 
-        prompt = self._build_creative_prompt(input_data)
+        cached_prefix, prompt = self._build_creative_prompt(input_data)
         system_prompt = (
             "You are an expert Creative Director specializing in video advertisements. "
             "Your role is to create compelling creative concepts that sell products effectively. "
@@ -41,11 +45,16 @@ class CreativeDirectorAgent(BaseAgent):
             "Return ONLY valid JSON matching the requested schema."
         )
 
-        response = self.call_llm(prompt, system_prompt, temperature=0.7)
+        response = await self.acall_llm(
+            prompt, system_prompt, temperature=0.7, cached_prefix=cached_prefix, max_tokens=1024
+        )
 
         creative_brief = self._parse_creative_response(response)
 
-        # Minimal schema check (keeps downstream agents safe)
+        return self._check_required_keys(creative_brief)
+
+    def _check_required_keys(self, creative_brief: Dict[str, Any]) -> Dict[str, Any]:
+        """Minimal schema check (keeps downstream agents safe)"""
         required_keys = [
             "creative_concept",
             "visual_style",
@@ -64,22 +73,15 @@ class CreativeDirectorAgent(BaseAgent):
 
         return creative_brief
 
-    def _build_creative_prompt(self, input_data: Dict[str, Any]) -> str:
-        """Build the prompt for creative direction"""
-
-        prompt = f"""Create a comprehensive creative brief for a video advertisement.
-
-Product Description: {input_data['product_description']}
-Target Audience: {input_data['target_audience']}
-"""
-
-        if "brand_guidelines" in input_data and input_data["brand_guidelines"] is not None:
-            prompt += f"\nBrand Guidelines: {input_data['brand_guidelines']}"
+    def _build_creative_prompt(self, input_data: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Build the prompt for creative direction.
 
-        if "script" in input_data and input_data["script"] is not None:
-            prompt += f"\nProvided Script: {input_data['script']}"
+        Returns (cached_prefix, prompt): the static schema/rules block, which is identical
+        across calls and therefore prompt-cacheable, followed by the product-specific part.
+        """
 
-        prompt += """
+        cached_prefix = """Create a comprehensive creative brief for a video advertisement.
 
 Provide your creative direction in the following JSON format:
 {
@@ -109,31 +111,35 @@ Rules:
 
 Make it compelling, memorable, and effective at selling the product!
 """
-        return prompt
+
+        prompt = f"""Product Description: {input_data['product_description']}
+Target Audience: {input_data['target_audience']}
+"""
+
+        if "brand_guidelines" in input_data and input_data["brand_guidelines"] is not None:
+            prompt += f"\nBrand Guidelines: {input_data['brand_guidelines']}"
+
+        if "script" in input_data and input_data["script"] is not None:
+            prompt += f"\nProvided Script: {input_data['script']}"
+
+        return cached_prefix, prompt
 
     def _parse_creative_response(self, response: str) -> Dict[str, Any]:
         """Parse LLM response into structured creative brief"""
         # 1) Strip common markdown fences if present
-        cleaned = response.strip()
-        cleaned = re.sub(r"^```(?:json)?\s*", "", cleaned, flags=re.IGNORECASE)
-        cleaned = re.sub(r"\s*```$", "", cleaned)
+        cleaned = strip_fences(response)
 
         # 2) Try full JSON parse first
         try:
-            return json.loads(cleaned)
+            return loads_json(cleaned)
         except json.JSONDecodeError:
             pass
 
-        # 3) Fallback: extract the largest JSON object substring
-        try:
-            start_idx = cleaned.find("{")
-            end_idx = cleaned.rfind("}") + 1
-            if start_idx != -1 and end_idx > start_idx:
-                json_str = cleaned[start_idx:end_idx]
-                return json.loads(json_str)
-        except json.JSONDecodeError:
-            self.logger.warning("Could not parse JSON from creative response")
+        # 3) Fallback: decode the JSON object embedded in the text
+        parsed = decode_json_object(cleaned)
+        if parsed is not None:
+            return parsed
+        self.logger.warning("Could not parse JSON from creative response")
 
         # 4) Final fallback: return raw response
         return {"raw_response": response}
-
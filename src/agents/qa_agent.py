@@ -1,10 +1,46 @@
-from .base_agent import BaseAgent
-from typing import Dict, Any, List
+from .base_agent import BaseAgent, run_async
+from typing import Dict, Any, List, Optional
+import asyncio
 import os
-import json
-import re
+import math
+import subprocess
 
-from moviepy.editor import VideoFileClip
+import numpy as np
+import orjson
+
+from ._parse import loads_json
+
+
+def _parse_frame_rate(rate: Optional[str]) -> float:
+    """Parse an ffprobe frame rate such as "30/1" or "30000/1001"."""
+    if not rate:
+        return 0.0
+    num, _, den = rate.partition("/")
+    try:
+        return round(float(num) / float(den or 1), 3)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _as_score(value: Any) -> Optional[float]:
+    """Numeric value of an LLM-reported score (number or numeric string), else None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        try:
+            value = float(value.strip())
+        except ValueError:
+            return None
+    if isinstance(value, (int, float)) and math.isfinite(value):
+        return float(value)
+    return None
+
+
+def _dumps_indented(value: Any) -> str:
+    """Pretty-printed JSON for prompts (orjson; same layout as json.dumps(indent=2))."""
+    return orjson.dumps(
+        value, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    ).decode()
 
 
 class QAAgent(BaseAgent):
@@ -29,10 +65,17 @@ class QAAgent(BaseAgent):
             - issues: list
             - recommendations: list
         """
+        return run_async(self.aprocess(input_data))
+
+    async def aprocess(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of `process`"""
         self.validate_input(input_data, ["video_path"])
 
         video_path = input_data["video_path"]
-        if not os.path.exists(video_path):
+        try:
+            # One stat serves both the existence check and the file size
+            stat_result = os.stat(video_path)
+        except FileNotFoundError:
             return {
                 "approved": False,
                 "quality_score": 0.0,
@@ -42,15 +85,16 @@ class QAAgent(BaseAgent):
                 "content_check": {"score": 0.0, "issues": ["No file to review"]},
             }
 
-        technical_check = self._check_technical_quality(
-            video_path=video_path,
-            requirements=input_data.get("original_requirements", {}) or {},
-        )
+        requirements = input_data.get("original_requirements", {}) or {}
 
-        content_check = self._check_content_quality(
-            requirements=input_data.get("original_requirements", {}) or {},
-            creative_brief=input_data.get("creative_brief", {}) or {},
-            scenes=input_data.get("scenes", []) or [],
+        # Technical check waits on file/ffmpeg I/O, content check on Claude: overlap them
+        technical_check, content_check = await asyncio.gather(
+            asyncio.to_thread(self._check_technical_quality, video_path, requirements, stat_result),
+            self._acheck_content_quality(
+                requirements=requirements,
+                creative_brief=input_data.get("creative_brief", {}) or {},
+                scenes=input_data.get("scenes", []) or [],
+            ),
         )
 
         quality_score = self._calculate_quality_score(technical_check, content_check)
@@ -68,13 +112,19 @@ class QAAgent(BaseAgent):
             "recommendations": recommendations,
         }
 
-    def _check_technical_quality(self, video_path: str, requirements: Dict[str, Any]) -> Dict[str, Any]:
+    def _check_technical_quality(
+        self,
+        video_path: str,
+        requirements: Dict[str, Any],
+        stat_result: Optional[os.stat_result] = None,
+    ) -> Dict[str, Any]:
         """Check technical aspects: file size, duration, resolution, fps, audio presence."""
         issues: List[str] = []
 
+        st = stat_result if stat_result is not None else os.stat(video_path)
         checks: Dict[str, Any] = {
             "file_exists": True,
-            "file_size_mb": round(os.path.getsize(video_path) / (1024 * 1024), 3),
+            "file_size_mb": round(st.st_size / (1024 * 1024), 3),
         }
 
         # Basic file size sanity
@@ -83,40 +133,36 @@ class QAAgent(BaseAgent):
         elif checks["file_size_mb"] > 200:
             issues.append("Video file is very large - consider compression")
 
-        # Read metadata via MoviePy (already in your deps)
+        # Read metadata with a single ffprobe call (no decoder setup)
         try:
-            with VideoFileClip(video_path) as clip:
-                checks["duration_seconds"] = round(float(clip.duration), 2)
-                checks["fps"] = float(getattr(clip, "fps", 0) or 0)
-                checks["resolution"] = f"{clip.w}x{clip.h}"
-                checks["has_audio"] = clip.audio is not None
-
-                # Optional requirements checks (if provided)
-                target_duration = requirements.get("duration") or requirements.get("target_duration")
-                if target_duration is not None:
-                    try:
-                        td = float(target_duration)
-                        if abs(checks["duration_seconds"] - td) > 1.0:
-                            issues.append(f"Duration mismatch: {checks['duration_seconds']}s vs target {td}s")
-                    except Exception:
-                        pass
-
-                target_resolution = requirements.get("resolution")
-                if target_resolution and isinstance(target_resolution, str):
-                    if target_resolution != checks["resolution"]:
-                        issues.append(f"Resolution mismatch: {checks['resolution']} vs target {target_resolution}")
-
-                target_fps = requirements.get("fps")
-                if target_fps is not None:
-                    try:
-                        tfps = float(target_fps)
-                        if checks["fps"] and abs(checks["fps"] - tfps) > 1.0:
-                            issues.append(f"FPS mismatch: {checks['fps']} vs target {tfps}")
-                    except Exception:
-                        pass
-
-                if not checks["has_audio"]:
-                    issues.append("No audio track detected (missing voiceover/music)")
+            checks.update(self._probe_video(video_path))
+
+            # Optional requirements checks (if provided)
+            target_duration = requirements.get("duration") or requirements.get("target_duration")
+            if target_duration is not None:
+                try:
+                    td = float(target_duration)
+                    if abs(checks["duration_seconds"] - td) > 1.0:
+                        issues.append(f"Duration mismatch: {checks['duration_seconds']}s vs target {td}s")
+                except Exception:
+                    pass
+
+            target_resolution = requirements.get("resolution")
+            if target_resolution and isinstance(target_resolution, str):
+                if target_resolution != checks["resolution"]:
+                    issues.append(f"Resolution mismatch: {checks['resolution']} vs target {target_resolution}")
+
+            target_fps = requirements.get("fps")
+            if target_fps is not None:
+                try:
+                    tfps = float(target_fps)
+                    if checks["fps"] and abs(checks["fps"] - tfps) > 1.0:
+                        issues.append(f"FPS mismatch: {checks['fps']} vs target {tfps}")
+                except Exception:
+                    pass
+
+            if not checks["has_audio"]:
+                issues.append("No audio track detected (missing voiceover/music)")
 
         except Exception as e:
             issues.append(f"Could not read video metadata: {e}")
@@ -128,23 +174,52 @@ class QAAgent(BaseAgent):
 
         return {"score": score, "checks": checks, "issues": issues}
 
-    def _check_content_quality(
+    def _probe_video(self, video_path: str) -> Dict[str, Any]:
+        """Read duration, fps, resolution and audio presence via ffprobe (MoviePy if ffprobe is missing)."""
+        try:
+            result = subprocess.run(
+                ["ffprobe", "-v", "error", "-print_format", "json", "-show_streams", "-show_format", video_path],
+                capture_output=True,
+                check=True,
+            )
+        except FileNotFoundError:
+            self.logger.debug("ffprobe not found; reading video metadata with MoviePy")
+            return self._probe_video_moviepy(video_path)
+
+        probe = loads_json(result.stdout)
+        streams = probe.get("streams", []) or []
+        video = next((s for s in streams if s.get("codec_type") == "video"), None)
+        if video is None:
+            raise ValueError("no video stream found")
+
+        return {
+            "duration_seconds": round(float(probe["format"]["duration"]), 2),
+            "fps": _parse_frame_rate(video.get("avg_frame_rate")),
+            "resolution": f"{video['width']}x{video['height']}",
+            "has_audio": any(s.get("codec_type") == "audio" for s in streams),
+        }
+
+    def _probe_video_moviepy(self, video_path: str) -> Dict[str, Any]:
+        # Deferred: moviepy pulls in numpy/PIL/imageio-ffmpeg, only needed as a fallback
+        from moviepy.editor import VideoFileClip
+
+        with VideoFileClip(video_path) as clip:
+            return {
+                "duration_seconds": round(float(clip.duration), 2),
+                "fps": float(getattr(clip, "fps", 0) or 0),
+                "resolution": f"{clip.w}x{clip.h}",
+                "has_audio": clip.audio is not None,
+            }
+
+    async def _acheck_content_quality(
         self,
         requirements: Dict[str, Any],
         creative_brief: Dict[str, Any],
         scenes: List[Dict[str, Any]],
     ) -> Dict[str, Any]:
         """LLM-based check: messaging, pacing, CTA, audience fit, alignment."""
-        prompt = f"""Review this video advertisement project for quality and effectiveness.
-
-ORIGINAL REQUIREMENTS:
-{json.dumps(requirements, indent=2)}
-
-CREATIVE BRIEF:
-{json.dumps(creative_brief, indent=2)}
-
-IMPLEMENTED SCENES:
-{json.dumps(scenes, indent=2)}
+        # Static rubric/schema goes first so it can be served from the prompt cache
+        cached_prefix = """Review the video advertisement project below for quality and effectiveness.
 
 Evaluate the following aspects and provide scores (0-10) for each:
 1. Message Clarity
@@ -156,8 +231,8 @@ Evaluate the following aspects and provide scores (0-10) for each:
 7. Overall Effectiveness
 
 Return ONLY valid JSON in this format:
-{{
-  "scores": {{
+{
+  "scores": {
     "message_clarity": 8,
     "visual_appeal": 7,
     "brand_alignment": 9,
@@ -165,19 +240,31 @@ Return ONLY valid JSON in this format:
     "call_to_action": 7,
     "target_audience_fit": 8,
     "overall_effectiveness": 8
-  }},
+  },
   "strengths": ["strength1", "strength2"],
   "weaknesses": ["weakness1", "weakness2"],
   "issues": ["critical issue 1"],
   "suggestions": ["improvement 1", "improvement 2"]
-}}
+}
+"""
+
+        prompt = f"""ORIGINAL REQUIREMENTS:
+{_dumps_indented(requirements)}
+
+CREATIVE BRIEF:
+{_dumps_indented(creative_brief)}
+
+IMPLEMENTED SCENES:
+{_dumps_indented(scenes)}
 """
         system_prompt = (
             "You are an expert video advertisement reviewer with years of experience in marketing, "
             "creative direction, and video production. Be honest but constructive."
         )
 
-        response = self.call_llm(prompt, system_prompt, temperature=0.3)
+        response = await self.acall_llm(
+            prompt, system_prompt, temperature=0.3, cached_prefix=cached_prefix, max_tokens=512
+        )
 
         assessment = self._parse_json_response(
             response,
@@ -192,12 +279,11 @@ Return ONLY valid JSON in this format:
 
         # Normalize score 0-1
         scores = assessment.get("scores", {}) or {}
-        if scores:
-            try:
-                avg_score = sum(float(v) for v in scores.values()) / len(scores)
-                assessment["score"] = round(avg_score / 10.0, 2)
-            except Exception:
-                assessment["score"] = assessment.get("score", 0.5)
+        values = [_as_score(v) for v in scores.values()] if isinstance(scores, dict) else []
+        values = [v for v in values if v is not None]
+        if values:
+            vals = np.fromiter(values, dtype=np.float64, count=len(values))
+            assessment["score"] = round(float(np.clip(vals.mean() / 10.0, 0.0, 1.0)), 2)
         else:
             assessment.setdefault("score", 0.5)
 
@@ -224,7 +310,10 @@ Return ONLY valid JSON in this format:
 
         # Add model suggestions
         suggestions = content_check.get("suggestions", []) or []
-        recommendations.extend(suggestions)
+        if isinstance(suggestions, str):
+            suggestions = [suggestions]
+        # The model occasionally returns objects here; keep the plain-text suggestions only
+        recommendations.extend(s for s in suggestions if isinstance(s, str))
 
         # Add aspect-based recs
         scores = content_check.get("scores", {}) or {}
@@ -235,32 +324,5 @@ Return ONLY valid JSON in this format:
             except Exception:
                 pass
 
-        # Keep top 5, de-dup
-        deduped = []
-        for r in recommendations:
-            if r not in deduped:
-                deduped.append(r)
-        return deduped[:5]
-
-    def _parse_json_response(self, response: str, fallback: Dict[str, Any]) -> Dict[str, Any]:
-        """Robust JSON parsing, handles ```json fences and extra text."""
-        cleaned = response.strip()
-        cleaned = re.sub(r"^```(?:json)?\s*", "", cleaned, flags=re.IGNORECASE)
-        cleaned = re.sub(r"\s*```$", "", cleaned)
-
-        try:
-            return json.loads(cleaned)
-        except json.JSONDecodeError:
-            pass
-
-        try:
-            start_idx = cleaned.find("{")
-            end_idx = cleaned.rfind("}") + 1
-            if start_idx != -1 and end_idx > start_idx:
-                return json.loads(cleaned[start_idx:end_idx])
-        except Exception:
-            pass
-
-        self.logger.warning("Could not parse JSON from QA response")
-        return fallback
-
+        # Keep top 5, de-dup (dict keeps first-seen order)
+        return list(dict.fromkeys(recommendations))[:5]
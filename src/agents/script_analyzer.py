@@ -1,7 +1,9 @@
-from .base_agent import BaseAgent
-from typing import Dict, Any
+from .base_agent import BaseAgent, run_async
+from ._parse import decode_json_object, loads_json, strip_fences
+from typing import Dict, Any, Tuple
 import json
-import re
+
+import numpy as np
 
 
 class ScriptAnalyzerAgent(BaseAgent):
@@ -26,48 +28,51 @@ class ScriptAnalyzerAgent(BaseAgent):
             - voiceover_instructions: dict
             - call_to_action: dict
         """
+        return run_async(self.aprocess(input_data))
+
+    async def aprocess(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of `process`"""
         self.validate_input(input_data, ["script"])
 
-        prompt = self._build_analysis_prompt(input_data)
+        cached_prefix, prompt = self._build_analysis_prompt(input_data)
         system_prompt = (
             "You are an expert script analyst for video production. "
             "Break down scripts into actionable scenes with precise timing and visual requirements. "
             "Return ONLY valid JSON matching the requested schema."
         )
 
-        response = self.call_llm(prompt, system_prompt, temperature=0.3)
+        # Streamed: parsing starts as soon as the JSON object closes
+        response = await self.acall_llm_json(
+            prompt, system_prompt, temperature=0.3, cached_prefix=cached_prefix, max_tokens=2048
+        )
 
         analysis = self._parse_analysis_response(response)
 
-        # Minimal schema safety (downstream protection)
+        return self._apply_defaults(analysis, input_data.get("target_duration", 30))
+
+    def _apply_defaults(self, analysis: Dict[str, Any], target_duration: int) -> Dict[str, Any]:
+        """Minimal schema safety (downstream protection)"""
         analysis.setdefault("scenes", [])
         analysis.setdefault("visual_requirements", [])
         analysis.setdefault("voiceover_instructions", {})
         analysis.setdefault("call_to_action", {})
-        analysis.setdefault("total_duration", input_data.get("target_duration", 30))
+        analysis.setdefault("total_duration", target_duration)
 
         return analysis
 
-    def _build_analysis_prompt(self, input_data: Dict[str, Any]) -> str:
-        """Build prompt for script analysis"""
+    def _build_analysis_prompt(self, input_data: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Build prompt for script analysis.
+
+        Returns (cached_prefix, prompt): the schema/rules block only depends on the target
+        duration, so it is sent first and marked for prompt caching; the script and creative
+        direction follow.
+        """
 
         script = input_data["script"]
         target_duration = int(input_data.get("target_duration", 30))
 
-        prompt = f"""Analyze this script for a {target_duration}-second video advertisement.
-
-SCRIPT:
-{script}
-"""
-
-        if "creative_brief" in input_data and input_data["creative_brief"] is not None:
-            prompt += "\n\nCREATIVE DIRECTION:\n" + json.dumps(
-                input_data["creative_brief"], indent=2
-            )
-
-        prompt += f"""
-
-Break this down into a detailed production plan in JSON format:
+        cached_prefix = f"""Break the script below into a detailed production plan in JSON format:
 
 {{
   "total_duration": {target_duration},
@@ -118,38 +123,48 @@ Rules:
 
 Be precise with timing - scenes must total exactly {target_duration} seconds.
 """
-        return prompt
+
+        prompt = f"""Analyze this script for a {target_duration}-second video advertisement.
+
+SCRIPT:
+{script}
+"""
+
+        if "creative_brief" in input_data and input_data["creative_brief"] is not None:
+            prompt += "\n\nCREATIVE DIRECTION:\n" + json.dumps(
+                input_data["creative_brief"], indent=2
+            )
+
+        return cached_prefix, prompt
 
     def _parse_analysis_response(self, response: str) -> Dict[str, Any]:
         """Parse analysis response"""
-        cleaned = response.strip()
-        cleaned = re.sub(r"^```(?:json)?\s*", "", cleaned, flags=re.IGNORECASE)
-        cleaned = re.sub(r"\s*```$", "", cleaned)
+        cleaned = strip_fences(response)
 
         # 1) Try parse whole response
         try:
-            analysis = json.loads(cleaned)
+            analysis = loads_json(cleaned)
             self._validate_timing(analysis)
             return analysis
         except json.JSONDecodeError:
             pass
 
-        # 2) Fallback: extract largest JSON object substring
-        try:
-            start_idx = cleaned.find("{")
-            end_idx = cleaned.rfind("}") + 1
-            if start_idx != -1 and end_idx > start_idx:
-                json_str = cleaned[start_idx:end_idx]
-                analysis = json.loads(json_str)
-                self._validate_timing(analysis)
-                return analysis
-        except json.JSONDecodeError as e:
-            self.logger.error(f"JSON parse error: {e}")
+        # 2) Fallback: decode the JSON object embedded in the text
+        analysis = decode_json_object(cleaned)
+        if analysis is not None:
+            self._validate_timing(analysis)
+            return analysis
+        self.logger.error("JSON parse error: no JSON object found in analysis response")
 
         return {"raw_response": response}
 
     def _validate_timing(self, analysis: Dict[str, Any]) -> None:
-        """Ensure scenes have valid timing and total duration matches target."""
+        """
+        Ensure scenes have valid timing and total duration matches target.
+
+        Start/end times are recomputed from the durations (cumulative sum), so scenes are
+        back-to-back and end_time = start_time + duration holds for every scene.
+        """
         if "scenes" not in analysis or not isinstance(analysis["scenes"], list):
             return
 
@@ -157,25 +172,30 @@ Be precise with timing - scenes must total exactly {target_duration} seconds.
         if not isinstance(target, (int, float)):
             return
 
-        # Sum durations
-        total = 0.0
-        for s in analysis["scenes"]:
-            dur = s.get("duration")
-            if isinstance(dur, (int, float)):
-                total += float(dur)
+        scenes = analysis["scenes"]
+        has_duration = [isinstance(s.get("duration"), (int, float)) for s in scenes]
+        dur = np.array(
+            [float(s["duration"]) if ok else 0.0 for s, ok in zip(scenes, has_duration)],
+            dtype=np.float64,
+        )
+        total = float(dur.sum())
 
         # Warn if off by >1 second
-        if abs(total - float(target)) > 1.0:
+        if not np.isclose(total, float(target), rtol=0.0, atol=1.0):
             self.logger.warning(
                 f"Scene durations ({total:.2f}s) don't match target ({target}s)"
             )
-
         # Optional: if off by <= 1 second, auto-adjust last scene to match exactly
-        if analysis["scenes"] and abs(total - float(target)) <= 1.0:
-            delta = float(target) - total
-            last = analysis["scenes"][-1]
-            if isinstance(last.get("duration"), (int, float)):
-                last["duration"] = round(float(last["duration"]) + delta, 2)
-                if isinstance(last.get("start_time"), (int, float)):
-                    last["end_time"] = round(float(last["start_time"]) + float(last["duration"]), 2)
+        elif scenes and has_duration[-1]:
+            dur[-1] += float(target) - total
+            scenes[-1]["duration"] = round(float(dur[-1]), 2)
+
+        if not scenes:
+            return
 
+        starts = np.concatenate(([0.0], np.cumsum(dur[:-1])))
+        ends = starts + dur
+        for scene, ok, start, end in zip(scenes, has_duration, starts.tolist(), ends.tolist()):
+            if ok:
+                scene["start_time"] = round(start, 2)
+                scene["end_time"] = round(end, 2)
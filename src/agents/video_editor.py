@@ -1,14 +1,144 @@
 from .base_agent import BaseAgent
-from typing import Dict, Any, List, Optional
+from ..utils.paths import setup_directories, unique_filename
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import bisect
+import importlib.util
 import os
-import time
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+from PIL import Image
+
+# Optional dependency check without importing it: without PyAV, export goes through moviepy
+_HAS_PYAV = importlib.util.find_spec("av") is not None
+
+# moviepy, OpenCV and PyAV are imported inside the functions that use them: they are large
+# native packages, and importing them here would slow down every CLI start
+
+TARGET_SIZE = (1920, 1080)
+FADE_IN_SECONDS = 0.4
+
+# Extra ffmpeg arguments per H.264 encoder
+ENCODER_PARAMS: Dict[str, List[str]] = {
+    "h264_nvenc": ["-preset", "p4", "-b:v", "8M"],
+    "h264_qsv": ["-preset", "veryfast", "-b:v", "8M"],
+    "h264_videotoolbox": ["-b:v", "8M"],
+    # scenes are still images with short fades: stillimage tune keeps x264 cheap
+    "libx264": ["-crf", "23", "-tune", "stillimage"],
+}
+
+# Voiceover formats that can go into the MP4 without re-encoding
+COPYABLE_AUDIO = {".aac", ".m4a", ".mp3"}
+
+# Same settings for the PyAV encoder (codec private options)
+PYAV_ENCODER_OPTIONS: Dict[str, Dict[str, str]] = {
+    "h264_nvenc": {"preset": "p4"},
+    "h264_qsv": {"preset": "veryfast"},
+    "h264_videotoolbox": {},
+    "libx264": {"preset": "ultrafast", "crf": "23", "tune": "stillimage"},
+}
+
+
+def _detect_video_encoder() -> str:
+    """
+    Pick a hardware H.264 encoder when ffmpeg has one this machine can drive, else libx264.
+
+    VIDEO_ENCODER overrides detection. ffmpeg builds list NVENC/QSV even without the
+    hardware, so those also need a GPU hint; export still falls back to libx264 on failure.
+    """
+    override = os.getenv("VIDEO_ENCODER")
+    if override:
+        return override
+
+    from moviepy.config import get_setting
+
+    try:
+        encoders = subprocess.run(
+            [get_setting("FFMPEG_BINARY"), "-hide_banner", "-encoders"],
+            capture_output=True,
+            text=True,
+            timeout=10,
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return "libx264"
+
+    if sys.platform == "darwin" and "h264_videotoolbox" in encoders:
+        return "h264_videotoolbox"
+    if "h264_nvenc" in encoders and shutil.which("nvidia-smi"):
+        return "h264_nvenc"
+    if "h264_qsv" in encoders and os.path.exists("/dev/dri/renderD128"):
+        return "h264_qsv"
+    return "libx264"
+
+
+@lru_cache(maxsize=64)
+def _plan_fit(w: int, h: int) -> Tuple[int, int, int, int]:
+    """
+    (scaled_w, scaled_h, x0, y0) to cover 1920x1080 and center-crop a w x h image.
+
+    Cached: campaigns tend to reuse a handful of image sizes.
+    """
+    target_w, target_h = TARGET_SIZE
+    scale = max(target_w / w, target_h / h)
+    # never round below the target size
+    scaled_w = max(target_w, int(round(w * scale)))
+    scaled_h = max(target_h, int(round(h * scale)))
+    return scaled_w, scaled_h, (scaled_w - target_w) // 2, (scaled_h - target_h) // 2
+
+
+def _crop(arr: np.ndarray, x0: int, y0: int) -> np.ndarray:
+    target_w, target_h = TARGET_SIZE
+    return np.ascontiguousarray(arr[y0:y0 + target_h, x0:x0 + target_w])
+
+
+def _fit_to_1080p_cv2(image_path: str) -> Optional[np.ndarray]:
+    """
+    Scale an image to cover 1920x1080 and center-crop it (OpenCV); None if OpenCV can't read it.
+    """
+    import cv2
+
+    img = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+    h, w = img.shape[:2]
+    scaled_w, scaled_h, x0, y0 = _plan_fit(w, h)
+    interpolation = cv2.INTER_AREA if scaled_w < w else cv2.INTER_LINEAR
+    img = cv2.resize(img, (scaled_w, scaled_h), interpolation=interpolation)
+    return _crop(img, x0, y0)
+
+
+def _fit_to_1080p_pil(image_path: str) -> np.ndarray:
+    """Pillow fallback for formats OpenCV doesn't decode (e.g. GIF)."""
+    with Image.open(image_path) as img:
+        img = img.convert("RGB")
+        scaled_w, scaled_h, x0, y0 = _plan_fit(*img.size)
+        img = img.resize((scaled_w, scaled_h), Image.BILINEAR)
+    return _crop(np.asarray(img), x0, y0)
+
+
+def _prepare_scene_image(image_path: str) -> np.ndarray:
+    """Decode an image and fit it to exactly 1920x1080 (runs in a worker process)."""
+    arr = _fit_to_1080p_cv2(image_path)
+    if arr is None:
+        arr = _fit_to_1080p_pil(image_path)
+    return arr
 
-from moviepy.editor import (
-    ImageClip,
-    AudioFileClip,
-    concatenate_videoclips,
-)
-from moviepy.video.fx.all import crop
+
+def _voiceover_packets(audio_in: Any, end: float) -> Iterator[Tuple[float, Any]]:
+    """(start seconds, packet) for each voiceover packet starting before `end` (audio past the video is trimmed)."""
+    for packet in audio_in.demux(audio_in.streams.audio[0]):
+        if packet.dts is None:
+            continue  # demuxer flush packet
+        start = float((packet.pts if packet.pts is not None else packet.dts) * packet.time_base)
+        if start >= end:
+            return
+        yield start, packet
 
 
 class VideoEditorAgent(BaseAgent):
@@ -16,6 +146,10 @@ class VideoEditorAgent(BaseAgent):
 
     def __init__(self):
         super().__init__(name="VideoEditor")
+        setup_directories()
+
+        # Detected on first export (runs ffmpeg)
+        self.video_encoder: Optional[str] = None
 
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -43,38 +177,45 @@ class VideoEditorAgent(BaseAgent):
         fps = int(input_data.get("fps", 30))
         voiceover_path = input_data.get("voiceover_path")
 
-        # Create video clips from scenes
-        video_clips = self._create_video_clips(scenes, scene_visuals, image_analysis)
-
-        # Assemble timeline (video + audio)
-        final_video = self._assemble_timeline(video_clips, voiceover_path)
+        # Decode and fit every scene image to 1920x1080
+        prepared = self._prepare_scenes(scenes, scene_visuals, image_analysis)
 
-        # Export
-        output_path = self._export_video(final_video, fps=fps)
+        if _HAS_PYAV:
+            # Still images: encode each scene frame once and repeat it, no per-frame rendering
+            output_path, duration = self._encode_pyav(prepared, fps, voiceover_path)
+        else:
+            final_video = self._assemble_timeline(prepared)
+            output_path = self._export_video(final_video, fps=fps, voiceover_path=voiceover_path)
+            duration = float(final_video.duration)
 
         return {
             "video_path": output_path,
-            "duration": float(final_video.duration),
+            "duration": duration,
             "resolution": "1920x1080",
             "fps": fps,
         }
 
-    def _create_video_clips(
+    def _prepare_scenes(
         self,
         scenes: List[Dict[str, Any]],
         scene_visuals: Dict[str, Any],
         image_analysis: List[Dict[str, Any]],
-    ) -> List[ImageClip]:
-        """Create a clip per scene using matched images."""
-        clips: List[ImageClip] = []
-
+    ) -> List[Tuple[np.ndarray, float, bool]]:
+        """(1920x1080 RGB array, duration, fade_in) per scene, using matched images."""
         scene_matches = scene_visuals.get("scene_matches", []) or []
 
+        # scene_id -> first match for it (same pick as a linear scan, without the O(S*M) cost)
+        match_by_id: Dict[Any, Dict[str, Any]] = {}
+        for match in scene_matches:
+            match_by_id.setdefault(match.get("scene_id"), match)
+
+        # (image_path, duration, fade_in) per scene that has a usable image
+        jobs: List[Tuple[str, float, bool]] = []
         for scene in scenes:
             scene_id = scene.get("scene_id")
             duration = float(scene.get("duration", 5))
 
-            visual = next((v for v in scene_matches if v.get("scene_id") == scene_id), None)
+            visual = match_by_id.get(scene_id)
 
             # If no visual match, skip (or later: generate placeholder)
             if not visual:
@@ -84,26 +225,35 @@ class VideoEditorAgent(BaseAgent):
             image_id = visual.get("image_id")
             image_path = self._get_image_path(image_id, image_analysis)
 
-            if not image_path or not os.path.exists(image_path):
+            if not image_path:
                 self.logger.warning(f"Image not found for {scene_id} (image_id={image_id}): {image_path}")
                 continue
 
-            clip = ImageClip(image_path).set_duration(duration)
-
-            # Fit to 1920x1080 with crop (no black bars)
-            clip = self._fit_to_1080p(clip)
-
-            # Simple transition in
             transition = (scene.get("transition_in") or "fade").lower()
-            if transition == "fade":
-                clip = clip.fadein(0.4)
+            jobs.append((image_path, duration, transition == "fade"))
 
-            clips.append(clip)
+        if not jobs:
+            raise ValueError("No video clips created (check image paths and scene_matches).")
 
-        if not clips:
+        # Decode + resample + crop is CPU-bound: prepare each distinct image once, in parallel.
+        # Scenes sharing an image share the array (clips only read it).
+        unique_paths = list(dict.fromkeys(path for path, _duration, _fade in jobs))
+        workers = min(len(unique_paths), os.cpu_count() or 1)
+        arrays: Dict[str, np.ndarray] = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {path: executor.submit(_prepare_scene_image, path) for path in unique_paths}
+            for path, future in futures.items():
+                # No exists() pre-check: a missing/unreadable file surfaces here instead
+                try:
+                    arrays[path] = future.result()
+                except OSError as e:
+                    self.logger.warning(f"Image not found or unreadable, skipping its scenes: {path} ({e})")
+
+        prepared = [(arrays[path], duration, fade) for path, duration, fade in jobs if path in arrays]
+        if not prepared:
             raise ValueError("No video clips created (check image paths and scene_matches).")
 
-        return clips
+        return prepared
 
     def _get_image_path(self, image_id: Optional[int], image_analysis: List[Dict[str, Any]]) -> Optional[str]:
         """Resolve image_id -> actual path using VisualDesigner image_analysis."""
@@ -117,59 +267,197 @@ class VideoEditorAgent(BaseAgent):
             return None
         return None
 
-    def _fit_to_1080p(self, clip: ImageClip) -> ImageClip:
-        """
-        Resize and crop to exact 1920x1080.
-        Strategy: scale up until it covers 1920x1080, then center-crop.
-        """
-        target_w, target_h = 1920, 1080
-        w, h = clip.size
+    def _assemble_timeline(self, prepared: List[Tuple[np.ndarray, float, bool]]):
+        """Build one image-sequence clip from the prepared scenes (audio is muxed in at export)."""
+        from moviepy.editor import ImageSequenceClip
 
-        # scale factor to cover target
-        scale = max(target_w / w, target_h / h)
-        clip = clip.resize(scale)
+        # One clip with a single frame lookup instead of a clip (and callback chain) per scene
+        durations = [duration for _arr, duration, _fade in prepared]
+        final_video = ImageSequenceClip([arr for arr, _duration, _fade in prepared], durations=durations)
 
-        # center crop
-        clip = crop(clip, width=target_w, height=target_h, x_center=clip.w / 2, y_center=clip.h / 2)
-        return clip
+        scene_starts = np.concatenate(([0.0], np.cumsum(durations)[:-1])).tolist()
+        fades = [fade for _arr, _duration, fade in prepared]
+        if any(fades):
 
-    def _assemble_timeline(
-        self,
-        video_clips: List[ImageClip],
-        voiceover_path: Optional[str] = None,
-    ):
-        """Concatenate clips and attach voiceover audio if available."""
-        final_video = concatenate_videoclips(video_clips, method="compose")
-
-        if voiceover_path and os.path.exists(voiceover_path):
-            audio = AudioFileClip(voiceover_path)
-            # If audio is longer than video, trim it; if shorter, keep as-is
-            if audio.duration > final_video.duration:
-                audio = audio.subclip(0, final_video.duration)
-            final_video = final_video.set_audio(audio)
+            def fade_in(get_frame, t):
+                # Fade from black at the start of each scene with a fade transition
+                frame = get_frame(t)
+                i = bisect.bisect_right(scene_starts, t) - 1
+                elapsed = t - scene_starts[i]
+                if fades[i] and elapsed < FADE_IN_SECONDS:
+                    return (frame * (elapsed / FADE_IN_SECONDS)).astype(np.uint8)
+                return frame
+
+            final_video = final_video.fl(fade_in)
+
+        return final_video
+
+    def _new_output_path(self) -> str:
+        """Timestamped path for the exported video."""
+        return os.path.join("data/output/videos", unique_filename("final_ad", "mp4"))
+
+    def _get_video_encoder(self) -> str:
+        """H.264 encoder to export with (detected once, see `_detect_video_encoder`)."""
+        if self.video_encoder is None:
+            self.video_encoder = _detect_video_encoder()
+            self.logger.info(f"Using video encoder: {self.video_encoder}")
+        return self.video_encoder
+
+    def _export_video(self, video, fps: int = 30, voiceover_path: Optional[str] = None) -> str:
+        """Export final video (voiceover is muxed in afterwards without re-encoding the video)."""
+        output_path = self._new_output_path()
+        self._get_video_encoder()
+
+        has_voiceover = bool(voiceover_path) and os.path.exists(voiceover_path)
+        video_path = f"{output_path}.video.mp4" if has_voiceover else output_path
+
+        try:
+            self._write_video(video, video_path, fps, self.video_encoder)
+        except (IOError, OSError) as e:
+            if self.video_encoder == "libx264":
+                raise
+            # e.g. NVENC listed by ffmpeg but no usable GPU/driver
+            self.logger.warning(f"{self.video_encoder} export failed ({e}); falling back to libx264.")
+            self.video_encoder = "libx264"
+            self._write_video(video, video_path, fps, self.video_encoder)
+
+        if has_voiceover:
+            try:
+                self._mux_voiceover(video_path, voiceover_path, output_path, float(video.duration))
+            finally:
+                os.remove(video_path)
         else:
             self.logger.info("No voiceover audio attached.")
 
-        return final_video
+        self.logger.info(f"Video exported: {output_path}")
+        return output_path
 
-    def _export_video(self, video, fps: int = 30) -> str:
-        """Export final video."""
-        output_dir = "data/output/videos"
-        os.makedirs(output_dir, exist_ok=True)
+    def _mux_voiceover(self, video_path: str, voiceover_path: str, output_path: str, duration: float) -> None:
+        """
+        Add the voiceover to an exported video with ffmpeg stream copy.
 
-        ts = int(time.time())
-        output_path = os.path.join(output_dir, f"final_ad_{ts}.mp4")
+        The video stream is copied as is; MP4-compatible audio (AAC/MP3) is copied too, anything
+        else is encoded to AAC. Audio longer than the video is cut at the video's end.
+        """
+        from moviepy.config import get_setting
+
+        audio_codec = "copy" if os.path.splitext(voiceover_path)[1].lower() in COPYABLE_AUDIO else "aac"
+        cmd = [
+            get_setting("FFMPEG_BINARY"), "-y", "-v", "error",
+            "-i", video_path,
+            "-t", f"{duration:.3f}", "-i", voiceover_path,
+            "-map", "0:v:0", "-map", "1:a:0",
+            "-c:v", "copy", "-c:a", audio_codec,
+            output_path,
+        ]
+        try:
+            subprocess.run(cmd, capture_output=True, text=True, check=True)
+        except subprocess.CalledProcessError as e:
+            raise IOError(f"Muxing voiceover failed: {e.stderr.strip()}") from e
 
+    def _write_video(self, video, output_path: str, fps: int, encoder: str) -> None:
+        """Run moviepy's ffmpeg export with the given H.264 encoder."""
         video.write_videofile(
             output_path,
             fps=fps,
-            codec="libx264",
-            audio_codec="aac",
-            temp_audiofile="temp-audio.m4a",
-            remove_temp=True,
-            threads=4,
+            codec=encoder,
+            audio=False,
+            # hardware encoders don't use CPU threads; x264 should get every core
+            threads=os.cpu_count() if encoder == "libx264" else None,
+            preset="ultrafast" if encoder == "libx264" else "medium",
+            ffmpeg_params=ENCODER_PARAMS.get(encoder, []),
         )
 
+    def _encode_pyav(
+        self,
+        prepared: List[Tuple[np.ndarray, float, bool]],
+        fps: int,
+        voiceover_path: Optional[str] = None,
+    ) -> Tuple[str, float]:
+        """Encode the prepared scenes (plus voiceover) with PyAV; returns (path, duration)."""
+        output_path = self._new_output_path()
+        encoder = self._get_video_encoder()
+
+        try:
+            duration = self._write_pyav(output_path, prepared, fps, voiceover_path, encoder)
+        except Exception as e:
+            if encoder == "libx264":
+                raise
+            self.logger.warning(f"{encoder} export failed ({e}); falling back to libx264.")
+            self.video_encoder = "libx264"
+            duration = self._write_pyav(output_path, prepared, fps, voiceover_path, self.video_encoder)
+
         self.logger.info(f"Video exported: {output_path}")
-        return output_path
+        return output_path, duration
 
+    def _write_pyav(
+        self,
+        output_path: str,
+        prepared: List[Tuple[np.ndarray, float, bool]],
+        fps: int,
+        voiceover_path: Optional[str],
+        encoder: str,
+    ) -> float:
+        """Write the video frame by frame, interleaving the packet-copied voiceover; returns duration."""
+        import av
+
+        # faststart: moov atom up front, so players can start before the whole file is loaded
+        container = av.open(output_path, "w", options={"movflags": "+faststart"})
+        audio_in = None
+        try:
+            stream = container.add_stream(encoder, rate=fps)
+            stream.width, stream.height = TARGET_SIZE
+            stream.pix_fmt = "yuv420p"
+            options = dict(PYAV_ENCODER_OPTIONS.get(encoder, {}))
+            if encoder == "libx264":
+                options["threads"] = str(os.cpu_count() or 1)
+            else:
+                stream.bit_rate = 8_000_000
+            stream.options = options
+
+            frame_counts = [max(1, int(round(duration * fps))) for _arr, duration, _fade in prepared]
+            total_duration = sum(frame_counts) / fps
+
+            audio_out = None
+            audio_packets = iter(())
+            if voiceover_path and os.path.exists(voiceover_path):
+                audio_in = av.open(voiceover_path)
+                audio_out = container.add_stream(template=audio_in.streams.audio[0])
+                audio_packets = _voiceover_packets(audio_in, total_duration)
+            else:
+                self.logger.info("No voiceover audio attached.")
+            next_audio = next(audio_packets, None)
+
+            def mux_audio_until(t: float) -> None:
+                # Packet copy (no re-encode), interleaved with the video by timestamp
+                nonlocal next_audio
+                while next_audio is not None and next_audio[0] <= t:
+                    packet = next_audio[1]
+                    packet.stream = audio_out
+                    container.mux(packet)
+                    next_audio = next(audio_packets, None)
+
+            fade_frames = max(1, int(round(FADE_IN_SECONDS * fps)))
+            pts = 0
+            for (arr, _duration, fade), n_frames in zip(prepared, frame_counts):
+                # One YUV conversion per scene; the encoder sees the same frame repeated
+                still = av.VideoFrame.from_ndarray(arr, format="rgb24").reformat(format="yuv420p")
+                for i in range(n_frames):
+                    if fade and i < fade_frames:
+                        # Fade in from black, same curve as moviepy's fadein
+                        faded = (arr * (i / fade_frames)).astype(np.uint8)
+                        frame = av.VideoFrame.from_ndarray(faded, format="rgb24").reformat(format="yuv420p")
+                    else:
+                        frame = still
+                    frame.pts = pts
+                    pts += 1
+                    container.mux(stream.encode(frame))
+                    mux_audio_until(pts / fps)
+            container.mux(stream.encode())
+            mux_audio_until(float("inf"))
+        finally:
+            if audio_in is not None:
+                audio_in.close()
+            container.close()
+
+        return total_duration
@@ -1,9 +1,58 @@
 from .base_agent import BaseAgent
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from PIL import Image
 import os
 import json
-import re
+import struct
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# JPEG start-of-frame markers (all except DHT/JPG/DAC, which share the range)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _read_image_header(path: str) -> Optional[Tuple[int, int, str]]:
+    """
+    (width, height, format) read from a PNG/JPEG header without decoding the image.
+
+    Reads only the bytes up to the size field; returns None for other or malformed files.
+    """
+    with open(path, "rb") as f:
+        head = f.read(24)
+
+        if head.startswith(_PNG_SIGNATURE) and head[12:16] == b"IHDR":
+            width, height = struct.unpack(">II", head[16:24])
+            return width, height, "PNG"
+
+        if not head.startswith(b"\xff\xd8"):
+            return None
+
+        # Walk JPEG segments until the start-of-frame marker
+        f.seek(2)
+        while True:
+            byte = f.read(1)
+            while byte == b"\xff":  # fill bytes
+                byte = f.read(1)
+            if not byte:
+                return None
+            marker = byte[0]
+            if marker == 0xD8 or 0xD0 <= marker <= 0xD7 or marker == 0x01:
+                continue  # standalone markers carry no length
+            if marker == 0xD9:
+                return None
+
+            length_bytes = f.read(2)
+            if len(length_bytes) < 2:
+                return None
+            (length,) = struct.unpack(">H", length_bytes)
+
+            if marker in _JPEG_SOF_MARKERS:
+                sof = f.read(5)
+                if len(sof) < 5:
+                    return None
+                height, width = struct.unpack(">HH", sof[1:5])
+                return width, height, "JPEG"
+
+            f.seek(length - 2, os.SEEK_CUR)
 
 
 class VisualDesignerAgent(BaseAgent):
@@ -20,6 +69,7 @@ class VisualDesignerAgent(BaseAgent):
             - images: list of image paths
             - scene_requirements: list (typically derived from Script Analyzer scenes/visual_requirements)
             - creative_brief: dict (optional)
+            - image_analysis: list (optional, precomputed `analyze_images()` result)
 
         Output:
             - image_analysis: list of analyzed images
@@ -32,8 +82,10 @@ class VisualDesignerAgent(BaseAgent):
         scene_requirements: List[Dict[str, Any]] = input_data["scene_requirements"]
         creative_brief: Dict[str, Any] = input_data.get("creative_brief", {}) or {}
 
-        # Analyze provided images
-        image_analysis = self._analyze_images(image_paths)
+        # Analyze provided images (unless the caller already did, e.g. while waiting on the brief)
+        image_analysis = input_data.get("image_analysis")
+        if image_analysis is None:
+            image_analysis = self.analyze_images(image_paths)
 
         # Match images to scenes (LLM reasoning step)
         scene_visuals = self._match_images_to_scenes(
@@ -51,34 +103,36 @@ class VisualDesignerAgent(BaseAgent):
             "processing_instructions": processing_instructions,
         }
 
-    def _analyze_images(self, image_paths: List[str]) -> List[Dict[str, Any]]:
+    def analyze_images(self, image_paths: List[str]) -> List[Dict[str, Any]]:
         """Analyze each provided image (basic metadata + placeholder description)."""
         analyses: List[Dict[str, Any]] = []
 
         for img_path in image_paths:
             try:
-                if not os.path.exists(img_path):
-                    self.logger.warning(f"Image path not found: {img_path}")
-                    continue
-
-                with Image.open(img_path) as img:
-                    width, height = img.size
-                    aspect_ratio = round(width / height, 4) if height else None
-
-                    description = self._describe_image(img_path, width, height)
-
-                    analyses.append(
-                        {
-                            "path": img_path,
-                            "filename": os.path.basename(img_path),
-                            "width": width,
-                            "height": height,
-                            "aspect_ratio": aspect_ratio,
-                            "description": description,
-                            "format": img.format,
-                        }
-                    )
-
+                # Header-only read for PNG/JPEG; PIL for anything else
+                header = _read_image_header(img_path)
+                if header is None:
+                    with Image.open(img_path) as img:
+                        header = (*img.size, img.format)
+                width, height, image_format = header
+
+                aspect_ratio = round(width / height, 4) if height else None
+                description = self._describe_image(img_path, width, height)
+
+                analyses.append(
+                    {
+                        "path": img_path,
+                        "filename": os.path.basename(img_path),
+                        "width": width,
+                        "height": height,
+                        "aspect_ratio": aspect_ratio,
+                        "description": description,
+                        "format": image_format,
+                    }
+                )
+
+            except FileNotFoundError:
+                self.logger.warning(f"Image path not found: {img_path}")
             except Exception as e:
                 self.logger.error(f"Error analyzing {img_path}: {e}")
 
@@ -155,7 +209,7 @@ Rules:
 - Prefer matching aspect ratio close to 16:9 for 1920x1080 output.
 """
 
-        response = self.call_llm(prompt, temperature=0.5)
+        response = self.call_llm(prompt, temperature=0.5, max_tokens=2048)
         return self._parse_json_response(
             response, fallback={"scene_matches": [], "missing_visuals": []}
         )
@@ -175,28 +229,3 @@ Rules:
             )
 
         return instructions
-
-    def _parse_json_response(self, response: str, fallback: Dict[str, Any]) -> Dict[str, Any]:
-        """Robust JSON parse: strips ```json fences and extracts object if needed."""
-        cleaned = response.strip()
-        cleaned = re.sub(r"^```(?:json)?\s*", "", cleaned, flags=re.IGNORECASE)
-        cleaned = re.sub(r"\s*```$", "", cleaned)
-
-        # 1) Try parse whole response
-        try:
-            return json.loads(cleaned)
-        except json.JSONDecodeError:
-            pass
-
-        # 2) Fallback: extract largest JSON object substring
-        try:
-            start_idx = cleaned.find("{")
-            end_idx = cleaned.rfind("}") + 1
-            if start_idx != -1 and end_idx > start_idx:
-                return json.loads(cleaned[start_idx:end_idx])
-        except Exception:
-            pass
-
-        self.logger.warning("Could not parse JSON from VisualDesigner response")
-        return fallback
-
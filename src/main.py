@@ -1,6 +1,9 @@
+import atexit
 import os
+import queue
 import sys
 import logging
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener
 from pathlib import Path
 from typing import List
 import argparse
@@ -8,6 +11,7 @@ import shutil
 from dotenv import load_dotenv
 
 from src.orchestrator.workflow_orchestrator import WorkflowOrchestrator
+from src.utils.paths import setup_directories
 
 # Load environment variables
 load_dotenv()
@@ -15,34 +19,32 @@ load_dotenv()
 # Ensure logs directory exists BEFORE setting up FileHandler
 Path("logs").mkdir(parents=True, exist_ok=True)
 
-# Setup logging
-logging.basicConfig(
-    level=os.getenv("LOG_LEVEL", "INFO"),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("logs/app.log"),
-        logging.StreamHandler(sys.stdout),
-    ],
-)
+# Setup logging: callers only enqueue records; a background listener formats and writes them.
+# File output goes through a MemoryHandler so it is written in batches (flushed right away on errors).
+_log_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
-logger = logging.getLogger(__name__)
+_file_handler = logging.FileHandler("logs/app.log")
+_file_handler.setFormatter(_log_formatter)
+_stream_handler = logging.StreamHandler(sys.stdout)
+_stream_handler.setFormatter(_log_formatter)
 
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_log_listener = QueueListener(
+    _log_queue,
+    MemoryHandler(capacity=1024, flushLevel=logging.ERROR, target=_file_handler),
+    _stream_handler,
+)
 
-def setup_directories():
-    """Create necessary directories"""
-    directories = [
-        "data/input",
-        "data/output/videos",
-        "data/output/audio",
-        "data/output/workflows",
-        "data/cache",
-        "logs",
-    ]
+# The queue handler only merges the message args; the listener's handlers do the real formatting
+_queue_handler = QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter("%(message)s"))
 
-    for directory in directories:
-        Path(directory).mkdir(parents=True, exist_ok=True)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), handlers=[_queue_handler])
+_log_listener.start()
+# Drain the queue before logging's own shutdown flushes and closes the handlers
+atexit.register(_log_listener.stop)
 
-    logger.info("Directories setup complete")
+logger = logging.getLogger(__name__)
 
 
 def validate_inputs(image_paths: List[str], script: str) -> bool:
@@ -72,6 +74,7 @@ def main():
     args = parser.parse_args()
 
     setup_directories()
+    logger.info("Directories setup complete")
 
     logger.info("=" * 80)
     logger.info("AGENTIC ADVERTISEMENT GENERATOR")
@@ -107,7 +110,12 @@ def main():
         if video_path and os.path.exists(video_path):
             dst = output_dir / Path(video_path).name
             if str(dst) != str(video_path):
-                shutil.copy2(video_path, dst)
+                try:
+                    # Same filesystem: hardlink, no bytes copied
+                    os.link(video_path, dst)
+                except OSError:
+                    # Cross-device, no hardlink support or dst already exists: copy contents only
+                    shutil.copyfile(video_path, dst)
                 final_path = str(dst)
 
         logger.info("=" * 80)
@@ -0,0 +1,105 @@
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import logging
+import os
+
+from src.agents.base_agent import run_async
+from src.agents.combined_brief import CombinedBriefAgent
+
+
+class BatchBriefRunner:
+    """Generates creative briefs + script analyses for many products (e.g. nightly catalog runs)"""
+
+    def __init__(self, use_batch: Optional[bool] = None, poll_interval: float = 60.0, max_concurrency: int = 4):
+        """
+        Args:
+            use_batch: submit through the Message Batches API (50% cheaper, results within 24h).
+                Defaults to ANTHROPIC_USE_BATCH=1; otherwise each product is a regular call.
+            poll_interval: seconds between batch status checks
+            max_concurrency: regular calls in flight at once when not using the Batches API
+        """
+        if not logging.getLogger().handlers:
+            logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
+        self.logger = logging.getLogger("BatchRunner")
+        self.agent = CombinedBriefAgent.get()
+        self.use_batch = os.getenv("ANTHROPIC_USE_BATCH", "0") == "1" if use_batch is None else use_batch
+        self.poll_interval = poll_interval
+        self.max_concurrency = max_concurrency
+
+    def run(
+        self,
+        items: List[Tuple[str, str]],
+        target_audience: str = "General consumers",
+        target_duration: int = 30,
+        brand_guidelines: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Produce {"creative_brief", "analysis"} for each (product_description, script) pair.
+
+        Results are returned in input order; a product whose request failed gets {"error": ...}.
+        """
+        inputs = [
+            {
+                "product_description": product_description,
+                "script": script,
+                "target_audience": target_audience,
+                "target_duration": target_duration,
+                "brand_guidelines": brand_guidelines,
+            }
+            for product_description, script in items
+        ]
+
+        if not self.use_batch:
+            return run_async(self._arun_interactive(inputs))
+
+        batch_id = self.submit(inputs)
+        self.agent.wait_for_batch(batch_id, poll_interval=self.poll_interval)
+        return self.collect(batch_id, inputs)
+
+    def submit(self, inputs: List[Dict[str, Any]]) -> str:
+        """Submit one combined CreativeDirector + ScriptAnalyzer request per product; returns the batch id"""
+        prompts = []
+        for input_data in inputs:
+            cached_prefix, prompt = self.agent._build_combined_prompt(input_data)
+            prompts.append((prompt, self.agent.SYSTEM_PROMPT, self.agent.TEMPERATURE, cached_prefix))
+
+        return self.agent.submit_batch(
+            prompts,
+            max_tokens=self.agent.MAX_TOKENS,
+            custom_ids=[f"product-{i}" for i in range(len(inputs))],
+        )
+
+    def collect(self, batch_id: str, inputs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Parse the results of a finished batch (submitted with `submit(inputs)`)"""
+        responses = self.agent.batch_results(batch_id)
+
+        results = []
+        for i, input_data in enumerate(inputs):
+            response = responses.get(f"product-{i}")
+            if response is None:
+                results.append({"error": f"No result for product {i} in batch {batch_id}"})
+            else:
+                results.append(self.agent._build_result(response, input_data))
+        return results
+
+    async def _arun_interactive(self, inputs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Bound the requests in flight so a large catalog doesn't trip the API rate limits
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def process_one(input_data: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.agent.aprocess(input_data)
+
+        outputs = await asyncio.gather(
+            *(process_one(input_data) for input_data in inputs), return_exceptions=True
+        )
+
+        results = []
+        for output in outputs:
+            if isinstance(output, Exception):
+                self.logger.error(f"Brief generation failed: {output}")
+                results.append({"error": str(output)})
+            else:
+                results.append(output)
+        return results
@@ -1,35 +1,52 @@
 from typing import Dict, Any, List, Optional
+import asyncio
 import logging
 from datetime import datetime
-import json
 import os
 
+import orjson
+
 # Import all agents
+from src.agents.base_agent import run_async
 from src.agents.creative_director import CreativeDirectorAgent
+from src.agents.combined_brief import CombinedBriefAgent
 from src.agents.script_analyzer import ScriptAnalyzerAgent
 from src.agents.visual_designer import VisualDesignerAgent
 from src.agents.audio_producer import AudioProducerAgent
 from src.agents.video_editor import VideoEditorAgent
 from src.agents.qa_agent import QAAgent
+from src.utils.paths import setup_directories, unique_filename
 
 
 class WorkflowOrchestrator:
     """Orchestrates the entire multi-agent workflow"""
 
-    def __init__(self):
+    def __init__(self, combined_brief: bool = True):
+        """
+        Args:
+            combined_brief: produce the creative brief and script analysis in one Claude call
+                (default, sampled at the analysis temperature 0.3). Set False to run
+                CreativeDirector (0.7) and ScriptAnalyzer (0.3) separately.
+        """
         # Basic logging setup (only if not already configured elsewhere)
         if not logging.getLogger().handlers:
             logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 
         self.logger = logging.getLogger("Orchestrator")
 
-        # Initialize all agents
-        self.creative_director = CreativeDirectorAgent()
-        self.script_analyzer = ScriptAnalyzerAgent()
-        self.visual_designer = VisualDesignerAgent()
-        self.audio_producer = AudioProducerAgent()
-        self.video_editor = VideoEditorAgent()
-        self.qa_agent = QAAgent()
+        # Output directories are created once per process, not on every export/save
+        setup_directories()
+
+        # Initialize all agents (shared instances, reused across orchestrators/runs)
+        self.creative_director = CreativeDirectorAgent.get()
+        self.script_analyzer = ScriptAnalyzerAgent.get()
+        self.visual_designer = VisualDesignerAgent.get()
+        self.audio_producer = AudioProducerAgent.get()
+        self.video_editor = VideoEditorAgent.get()
+        self.qa_agent = QAAgent.get()
+
+        self.combined_brief = combined_brief
+        self.combined_brief_agent = CombinedBriefAgent.get()
 
         # State management
         self.state = {
@@ -46,72 +63,127 @@ class WorkflowOrchestrator:
         image_paths: List[str],
         target_audience: str = "General consumers",
         target_duration: int = 30,
-        brand_guidelines: Optional[Dict[str, Any]] = None
+        brand_guidelines: Optional[Dict[str, Any]] = None,
+        keep_intermediates: bool = False
     ) -> Dict[str, Any]:
         """
         Main method to generate a complete video advertisement
 
+        Args:
+            keep_intermediates: keep every stage's full output in the state (and the saved
+                workflow file). By default they are reduced to summaries once QA is done.
+
         Returns:
             Dict containing video path and metadata
         """
+        return run_async(
+            self.agenerate_advertisement(
+                product_description=product_description,
+                script=script,
+                image_paths=image_paths,
+                target_audience=target_audience,
+                target_duration=target_duration,
+                brand_guidelines=brand_guidelines,
+                keep_intermediates=keep_intermediates,
+            )
+        )
+
+    async def agenerate_advertisement(
+        self,
+        product_description: str,
+        script: str,
+        image_paths: List[str],
+        target_audience: str = "General consumers",
+        target_duration: int = 30,
+        brand_guidelines: Optional[Dict[str, Any]] = None,
+        keep_intermediates: bool = False
+    ) -> Dict[str, Any]:
+        """Async variant of `generate_advertisement` (independent stages run concurrently)"""
         self.logger.info("Starting advertisement generation workflow")
         start_time = datetime.now()
 
+        # Image analysis only needs the image paths: run it while the brief is being written
+        image_analysis_task = asyncio.create_task(
+            asyncio.to_thread(self.visual_designer.analyze_images, image_paths)
+        )
+
         try:
-            # Step 1: Creative Direction
-            self.logger.info("Step 1: Creating creative brief")
-            self.state["current_step"] = "creative_direction"
-
-            creative_brief = self.creative_director.process({
-                "product_description": product_description,
-                "target_audience": target_audience,
-                "brand_guidelines": brand_guidelines,
-                "script": script
-            })
+            if self.combined_brief:
+                # Steps 1 + 2 in a single round trip
+                self.logger.info("Steps 1-2: Creating creative brief and analyzing script")
+                self.state["current_step"] = "creative_direction+script_analysis"
 
-            self.state["outputs"]["creative_brief"] = creative_brief
-            self.logger.info("✓ Creative brief completed")
+                combined = await self.combined_brief_agent.aprocess({
+                    "product_description": product_description,
+                    "target_audience": target_audience,
+                    "brand_guidelines": brand_guidelines,
+                    "script": script,
+                    "target_duration": target_duration
+                })
+                creative_brief = combined["creative_brief"]
+                script_analysis = combined["analysis"]
+
+                self.state["outputs"]["creative_brief"] = creative_brief
+                self.logger.info("✓ Creative brief completed")
+            else:
+                # Step 1: Creative Direction
+                self.logger.info("Step 1: Creating creative brief")
+                self.state["current_step"] = "creative_direction"
+
+                creative_brief = await self.creative_director.aprocess({
+                    "product_description": product_description,
+                    "target_audience": target_audience,
+                    "brand_guidelines": brand_guidelines,
+                    "script": script
+                })
 
-            # Step 2: Script Analysis
-            self.logger.info("Step 2: Analyzing script")
-            self.state["current_step"] = "script_analysis"
+                self.state["outputs"]["creative_brief"] = creative_brief
+                self.logger.info("✓ Creative brief completed")
 
-            script_analysis = self.script_analyzer.process({
-                "script": script,
-                "creative_brief": creative_brief,
-                "target_duration": target_duration
-            })
+                # Step 2: Script Analysis
+                self.logger.info("Step 2: Analyzing script")
+                self.state["current_step"] = "script_analysis"
+
+                script_analysis = await self.script_analyzer.aprocess({
+                    "script": script,
+                    "creative_brief": creative_brief,
+                    "target_duration": target_duration
+                })
 
             self.state["outputs"]["script_analysis"] = script_analysis
             scenes = script_analysis.get("scenes", []) or []
             self.logger.info(f"✓ Script analyzed into {len(scenes)} scenes")
 
-            # Step 3: Visual Design
+            # Steps 3 + 4: Visual Design and Audio Production only depend on the
+            # script analysis, so run them concurrently
             self.logger.info("Step 3: Processing visuals")
-            self.state["current_step"] = "visual_design"
+            self.logger.info("Step 4: Generating audio")
+            self.state["current_step"] = "visual_design+audio_production"
 
             # IMPORTANT: use scene-level requirements (scenes) for matching
-            visual_design = self.visual_designer.process({
-                "images": image_paths,
-                "scene_requirements": scenes,  # <-- changed from visual_requirements
-                "creative_brief": creative_brief
-            })
+            async def design_visuals() -> Dict[str, Any]:
+                # Only the visual step waits for the image analysis; audio starts right away
+                return await self.visual_designer.aprocess({
+                    "images": image_paths,
+                    "scene_requirements": scenes,  # <-- changed from visual_requirements
+                    "creative_brief": creative_brief,
+                    "image_analysis": await image_analysis_task
+                })
+
+            visual_design, audio_output = await asyncio.gather(
+                design_visuals(),
+                self.audio_producer.aprocess({
+                    "script": script,
+                    "voiceover_instructions": script_analysis.get("voiceover_instructions", {}) or {},
+                    "music_style": creative_brief.get("music_style", "upbeat"),
+                    "scenes": scenes,
+                    "duration": target_duration
+                }),
+            )
 
             self.state["outputs"]["visual_design"] = visual_design
             self.logger.info("✓ Visual design completed")
 
-            # Step 4: Audio Production
-            self.logger.info("Step 4: Generating audio")
-            self.state["current_step"] = "audio_production"
-
-            audio_output = self.audio_producer.process({
-                "script": script,
-                "voiceover_instructions": script_analysis.get("voiceover_instructions", {}) or {},
-                "music_style": creative_brief.get("music_style", "upbeat"),
-                "scenes": scenes,
-                "duration": target_duration
-            })
-
             self.state["outputs"]["audio_output"] = audio_output
             self.logger.info("✓ Audio production completed")
 
@@ -120,7 +192,7 @@ class WorkflowOrchestrator:
             self.state["current_step"] = "video_editing"
 
             # IMPORTANT: VideoEditorAgent expects scene_visuals + image_analysis separately
-            video_output = self.video_editor.process({
+            video_output = await self.video_editor.aprocess({
                 "scenes": scenes,
                 "scene_visuals": visual_design.get("scene_visuals", {}),
                 "image_analysis": visual_design.get("image_analysis", []),
@@ -136,7 +208,7 @@ class WorkflowOrchestrator:
             self.logger.info("Step 6: Quality review")
             self.state["current_step"] = "quality_assurance"
 
-            qa_result = self.qa_agent.process({
+            qa_result = await self.qa_agent.aprocess({
                 "video_path": video_path,
                 "original_requirements": {
                     "product_description": product_description,
@@ -157,6 +229,9 @@ class WorkflowOrchestrator:
 
             self.logger.info(f"✓ QA completed. Score: {qa_result.get('quality_score', 0)}")
 
+            if not keep_intermediates:
+                self._summarize_outputs()
+
             # Total time
             end_time = datetime.now()
             duration = (end_time - start_time).total_seconds()
@@ -190,16 +265,60 @@ class WorkflowOrchestrator:
                 "state": self.state
             }
 
+        finally:
+            # An earlier stage failed: don't leave the analysis task pending (or its error unretrieved)
+            if not image_analysis_task.done():
+                image_analysis_task.cancel()
+            await asyncio.gather(image_analysis_task, return_exceptions=True)
+
+    def _summarize_outputs(self) -> None:
+        """
+        Replace the stage outputs with small summaries.
+
+        The brief, scenes and QA report are still returned in the result metadata; this drops
+        the image analysis, scene matches, audio timeline etc. once nothing needs them.
+        """
+        outputs = self.state["outputs"]
+
+        creative_brief = outputs.get("creative_brief") or {}
+        script_analysis = outputs.get("script_analysis") or {}
+        visual_design = outputs.get("visual_design") or {}
+        audio_output = outputs.get("audio_output") or {}
+        qa_result = outputs.get("qa_result") or {}
+
+        summaries = {
+            "creative_brief": {"creative_concept": creative_brief.get("creative_concept")},
+            "script_analysis": {"scene_count": len(script_analysis.get("scenes", []) or [])},
+            "visual_design": {
+                "images_analyzed": len(visual_design.get("image_analysis", []) or []),
+                "scenes_matched": len(
+                    (visual_design.get("scene_visuals", {}) or {}).get("scene_matches", []) or []
+                ),
+            },
+            "audio_output": {"voiceover_path": audio_output.get("voiceover_path")},
+            "video_output": outputs.get("video_output"),
+            "qa_result": {
+                "approved": qa_result.get("approved"),
+                "quality_score": qa_result.get("quality_score"),
+            },
+        }
+
+        # Same keys as before, so get_status() still reports the completed steps
+        self.state["outputs"] = {step: summaries.get(step) for step in outputs}
+
     def _save_workflow_state(self, result: Dict[str, Any]) -> None:
         """Save the workflow state and results"""
         output_dir = "data/output/workflows"
-        os.makedirs(output_dir, exist_ok=True)
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        state_file = os.path.join(output_dir, f"workflow_{timestamp}.json")
+        state_file = os.path.join(output_dir, unique_filename("workflow", "json"))
 
-        with open(state_file, "w") as f:
-            json.dump({"state": self.state, "result": result}, f, indent=2)
+        with open(state_file, "wb") as f:
+            f.write(
+                orjson.dumps(
+                    {"state": self.state, "result": result},
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+                )
+            )
 
         self.logger.info(f"Workflow state saved: {state_file}")
 
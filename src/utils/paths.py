@@ -0,0 +1,38 @@
+"""Working directories and output file names used by the agents and the orchestrator."""
+import os
+import threading
+import time
+import uuid
+
+DIRECTORIES = [
+    "data/input",
+    "data/output/videos",
+    "data/output/audio",
+    "data/output/workflows",
+    "data/cache",
+    "logs",
+]
+
+_directories_ready = False
+_directories_lock = threading.Lock()
+
+
+def setup_directories() -> None:
+    """Create the working directories once per process (later calls are no-ops)."""
+    global _directories_ready
+
+    with _directories_lock:
+        if _directories_ready:
+            return
+        # Longest first: creating data/output/videos also creates data/output and data
+        for directory in sorted(DIRECTORIES, key=len, reverse=True):
+            os.makedirs(directory, exist_ok=True)
+        _directories_ready = True
+
+
+def unique_filename(prefix: str, ext: str) -> str:
+    """
+    "<prefix>_<YYYYmmdd_HHMMSS>_<6 hex>.<ext>": readable, sortable and collision-free even when
+    several outputs are written within the same second (batch/server mode).
+    """
+    return f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}.{ext}"